@@ -1,44 +1,9 @@
-from langchain_weaviate.vectorstores import WeaviateVectorStore
-from langchain_huggingface import HuggingFaceEmbeddings
-import weaviate
-from weaviate.classes.init import Auth
-from dotenv import load_dotenv
 import os
+import sys
 
-# Load the .env file
-load_dotenv()
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from recipe_search.cli import main
 
-# Access environment variables
-cluster_url = os.getenv('WEAVIATE_CLUSTER')
-auth_key = os.getenv('WEAVIATE_KEY')
-
-weaviate_client = weaviate.connect_to_weaviate_cloud(
-    cluster_url=cluster_url, 
-    auth_credentials=Auth.api_key(auth_key),
-    skip_init_checks=True,
-)
-
-embedding_model_name = "sentence-transformers/all-mpnet-base-v2"
-embeddings = HuggingFaceEmbeddings(
-    model_name=embedding_model_name
-)
-
-vectorstore = WeaviateVectorStore(client=weaviate_client, index_name="RecipeHFE", text_key="title", embedding=embeddings)
-
-# Perform a search query
-query = "dinner with low carb potato recipe"
-results = vectorstore.similarity_search(query, k=3)  # Retrieve top similar results
-
-print("\nHere are some meal options for you:\n")
-for i, result in enumerate(results):
-    print(f"Option {i + 1}:")
-    print("Title:", result.page_content)
-    print("Ingredients:", result.metadata.get("ingredients"))
-    print("Instructions:", result.metadata.get("instructions_list"))
-    print("Carbohydrates:", result.metadata.get("carbohydrates_g"), "g")
-    print("Fat:", result.metadata.get("fat_g"), "g")
-    print("Protein:", result.metadata.get("protein_g"), "g")
-    # Print other nutritional fields...
-    print()
-
-weaviate_client.close()
\ No newline at end of file
+# Hybrid search; SEARCH_ALPHA=1 is pure vector search, 0 pure keyword search
+if __name__ == "__main__":
+    main(["query", "dinner with low carb potato recipe", "--collection", "RecipeHFE", "--k", "3"])
@@ -0,0 +1,9 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from recipe_search.cli import main
+
+# python ragBatch.py questions.txt answers.jsonl; RAG_CONCURRENCY questions are in flight at once
+if __name__ == "__main__":
+    main(["rag-batch", *sys.argv[1:3]])
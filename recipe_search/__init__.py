@@ -0,0 +1 @@
+"""Shared helpers for the SentenceTransformers, HuggingFace and Vectoriser recipe scripts."""
@@ -0,0 +1,4 @@
+from recipe_search.cli import main
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Micro-batching of concurrent query embeddings.
+
+Each ``similarity_search`` embeds its query with its own forward pass. On
+a CPU a batch of 16 queries takes little longer than a single one, so
+under concurrent load it is much cheaper to collect the queries arriving
+within a few milliseconds and encode them together.
+
+``QueryBatcher`` runs a single background thread that takes the first
+waiting query, keeps collecting until ``max_batch_size`` queries are
+waiting or ``max_wait_ms`` has passed, and encodes them in one call.
+A query therefore waits at most ``max_wait_ms`` longer than it would
+without batching.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from langchain_core.embeddings import Embeddings
+
+MAX_BATCH_SIZE = 32
+MAX_WAIT_MS = 5.0
+
+
+class QueryBatcher:
+    """Coalesces concurrent ``embed`` calls into batched ``encode_batch`` calls."""
+
+    def __init__(self, encode_batch, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        self.encode_batch = encode_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.requests = queue.Queue()
+        self.batches = 0
+        self.queries = 0
+        self.worker = threading.Thread(target=self._run, name="query-batcher", daemon=True)
+        self.worker.start()
+
+    def submit(self, text):
+        """Queue ``text`` and return a future for its vector."""
+        future = Future()
+        self.requests.put((text, future))
+        return future
+
+    def embed(self, text):
+        """Return the vector for ``text``, encoded together with concurrent queries."""
+        return self.submit(text).result()
+
+    def _collect(self):
+        batch = [self.requests.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self.requests.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            texts = [text for text, _ in batch]
+            try:
+                vectors = self.encode_batch(texts)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(vector)
+            self.batches += 1
+            self.queries += len(batch)
+
+    @property
+    def mean_batch_size(self):
+        return self.queries / self.batches if self.batches else 0.0
+
+
+class BatchedEmbeddings(Embeddings):
+    """LangChain embeddings whose ``embed_query`` goes through a :class:`QueryBatcher`.
+
+    Queries are encoded with the wrapped model's ``embed_documents``, which
+    gives the same vectors as ``embed_query`` for sentence-transformers
+    models.
+    """
+
+    def __init__(self, embeddings, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        self.embeddings = embeddings
+        self.batcher = QueryBatcher(embeddings.embed_documents, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+
+    def embed_documents(self, texts):
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text):
+        return list(self.batcher.embed(text))
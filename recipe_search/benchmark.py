@@ -0,0 +1,310 @@
+"""Ingest and query benchmarks for the three pipeline variants.
+
+Each variant is benchmarked the way its scripts run it:
+
+- ``st``: SentenceTransformers encoding, as ``SentenceTransformers/``,
+- ``hf``: LangChain ``embed_documents`` encoding, as ``HuggingFace/``,
+- ``v4``: Weaviate's HuggingFace vectorizer, as ``Vectoriser/`` (Weaviate
+  backend only, since the vectors are computed by the server).
+
+against either the in-process index from :mod:`recipe_search.local_index`
+(``--backend local``, the default, hermetic) or a Weaviate started
+locally, e.g. with Docker (``--backend weaviate``). Benchmark collections
+are prefixed with ``Bench`` and deleted afterwards, so production
+collections are never touched.
+
+Ingest reports docs/sec, peak RSS and payload bytes (properties JSON plus
+float32 vectors). Query reports p50/p95/p99 latency of the embed and
+search stages, QPS at each ``--concurrency`` level, and recall@k of the
+vector index against exact search over the stored vectors. Every variant
+runs in its own process so peak RSS is its own, and one JSON object per
+variant is appended to ``--output`` for regression tracking::
+
+    python -m recipe_search.benchmark --variants st,hf --limit 2000 --output bench.jsonl
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from recipe_search.bootstrap import VARIANTS, bootstrap
+from recipe_search.ingest import ingest, stream_recipes
+from recipe_search.local_index import LocalIndexWriter, LocalVectorStore
+from recipe_search.planner import HYBRID_ALPHA, hybrid_kwargs, search_recipes
+from recipe_search.quantization import exact_neighbours, stored_vectors, vector_index_config_from_env
+from recipe_search.schema import collection_properties, infer_schema
+from recipe_search.sync import recipe_uuid
+
+LIMIT = 2000
+QUERIES = 200
+RECALL_QUERIES = 100
+K = 10
+CONCURRENCY = (1, 4, 16)
+
+# Meal planner style queries mixed with recipe titles from the benchmark corpus
+FIXED_QUERIES = (
+    "lunch with high protein potato recipe",
+    "dinner with low carb potato recipe",
+    "vegetarian breakfast with eggs",
+    "quick chicken dinner",
+    "low calorie dessert",
+)
+
+
+def _peak_rss_mb():
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return round(max(own, children) * scale / 2**20, 1)
+
+
+def percentiles(values):
+    if not values:
+        return {}
+    return {f"p{p}": round(float(np.percentile(values, p)), 2) for p in (50, 95, 99)}
+
+
+class CountingBatch:
+    """Wraps a batch and counts the objects and payload bytes added to it."""
+
+    def __init__(self, batch):
+        self.batch = batch
+        self.objects = 0
+        self.bytes = 0
+
+    def __enter__(self):
+        self.open_batch = self.batch.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return self.batch.__exit__(exc_type, exc, tb)
+
+    def add_object(self, collection, properties=None, uuid=None, vector=None):
+        self.objects += 1
+        self.bytes += len(json.dumps(properties or {}, default=str).encode("utf-8"))
+        if vector is not None:
+            self.bytes += 4 * len(vector)
+        self.open_batch.add_object(collection=collection, properties=properties, uuid=uuid, vector=vector)
+
+
+def variant_encoder(variant, boot):
+    """Return the ``texts -> vectors`` encoder the variant's ingest script uses, without the embedding cache."""
+    return None if variant == "v4" else boot.encoder(variant)
+
+
+def bench_ingest(batch, name, rows, encode, schema):
+    start = time.perf_counter()
+    counting = CountingBatch(batch)
+    ingest(counting, name, rows, encode=encode, uuid_for=recipe_uuid, schema=schema)
+    seconds = time.perf_counter() - start
+    return {
+        "docs": counting.objects,
+        "seconds": round(seconds, 2),
+        "docs_per_sec": round(counting.objects / seconds, 1) if seconds else None,
+        "payload_bytes": counting.bytes,
+    }
+
+
+def bench_queries(vectorstore, queries, concurrency_levels, k=K, alpha=HYBRID_ALPHA):
+    """Latency percentiles per stage at concurrency 1, and QPS at every level."""
+    def run(query):
+        timings = {}
+        start = time.perf_counter()
+        search_recipes(vectorstore, query, k=k, timings=timings, **hybrid_kwargs(alpha))
+        timings["total_ms"] = (time.perf_counter() - start) * 1000
+        return timings
+
+    # Load the model and warm the index before measuring
+    run(queries[0])
+    sequential = [run(query) for query in queries]
+    result = {
+        stage: percentiles([timings[stage] for timings in sequential]) for stage in ("embed_ms", "search_ms", "total_ms")
+    }
+    result["qps"] = {}
+    for concurrency in concurrency_levels:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            start = time.perf_counter()
+            list(pool.map(run, queries))
+            result["qps"][str(concurrency)] = round(len(queries) / (time.perf_counter() - start), 1)
+    return result
+
+
+def bench_recall(neighbours, uuids, vectors, queries=RECALL_QUERIES, k=K, seed=0):
+    """recall@k of ``neighbours(vector, limit) -> uuids`` against exact cosine search."""
+    rng = np.random.default_rng(seed)
+    sample = rng.choice(len(uuids), size=min(queries, len(uuids)), replace=False)
+    truth = exact_neighbours(vectors, sample, k)
+    hits = 0
+    for query, expected in zip(sample, truth):
+        # One extra result because the query vector finds its own object
+        found = set(neighbours(vectors[query], k + 1)) - {uuids[query]}
+        hits += len(found & {uuids[row] for row in expected})
+    return round(hits / (len(sample) * k), 4)
+
+
+def benchmark_queries(rows, seed=0, count=QUERIES):
+    rng = np.random.default_rng(seed)
+    titles = [row.get("title") for row in rows if row.get("title")]
+    picked = [titles[i] for i in rng.choice(len(titles), size=min(count, len(titles)), replace=False)] if titles else []
+    return (list(FIXED_QUERIES) + picked)[:count]
+
+
+def run_local(variant, args, boot, sample, rows, queries):
+    name = "Bench" + VARIANTS[variant]
+    index_dir = args.index_dir or tempfile.mkdtemp(prefix="recipe_bench_")
+    try:
+        writer = LocalIndexWriter(index_dir, metadata=boot.spec.metadata())
+        result = {"ingest": bench_ingest(writer, name, rows, variant_encoder(variant, boot), infer_schema(sample))}
+        store = LocalVectorStore.load(name, boot.base_embeddings(), directory=index_dir)
+        result["query"] = bench_queries(store, queries, args.concurrency, k=args.k, alpha=args.alpha)
+
+        def neighbours(vector, limit):
+            results = store.similarity_search(None, k=limit, vector=vector, alpha=1.0, return_uuids=True)
+            return [document.metadata["uuid"] for document in results]
+
+        uuids = [obj["uuid"] for obj in store.objects]
+        result["query"][f"recall@{args.k}"] = bench_recall(neighbours, uuids, np.asarray(store.vectors), k=args.k)
+        path = os.path.join(index_dir, name)
+        result["index_bytes"] = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+        return result
+    finally:
+        if not args.index_dir:
+            shutil.rmtree(index_dir, ignore_errors=True)
+
+
+def run_weaviate(variant, args, boot, sample, rows, queries):
+    import weaviate.classes.config as wvcc
+    from langchain_weaviate.vectorstores import WeaviateVectorStore
+
+    from recipe_search.upload import AdaptiveUploader
+
+    spec = boot.spec
+    client = boot.connect_local(args.host, args.port, args.grpc_port)
+    name = "Bench" + VARIANTS[variant]
+    try:
+        client.collections.delete(name)
+        schema = infer_schema(sample)
+        if variant == "v4":
+            vectorizer = wvcc.Configure.Vectorizer.text2vec_huggingface(model=spec.model_name, vectorize_collection_name=True)
+        else:
+            vectorizer = wvcc.Configure.Vectorizer.none()
+        collection = client.collections.create(
+            name=name,
+            description=spec.description(),
+            vectorizer_config=vectorizer,
+            vector_index_config=vector_index_config_from_env(),
+            properties=collection_properties(schema),
+        )
+        uploader = AdaptiveUploader(client, batch_size=10, concurrency=1) if variant == "v4" else AdaptiveUploader(client)
+        result = {"ingest": bench_ingest(uploader, name, rows, variant_encoder(variant, boot), schema)}
+        result["ingest"]["failed"] = len(uploader.failed)
+
+        store = WeaviateVectorStore(client=client, index_name=name, text_key="title", embedding=boot.base_embeddings())
+        result["query"] = bench_queries(store, queries, args.concurrency, k=args.k, alpha=args.alpha)
+
+        def neighbours(vector, limit):
+            return [str(obj.uuid) for obj in collection.query.near_vector(near_vector=vector.tolist(), limit=limit).objects]
+
+        uuids, vectors = stored_vectors(collection)
+        result["query"][f"recall@{args.k}"] = bench_recall(neighbours, uuids, vectors, k=args.k)
+        return result
+    finally:
+        if not args.keep:
+            client.collections.delete(name)
+        boot.close()
+
+
+def run_variant(variant, args):
+    boot = bootstrap()
+    sample, recipes = stream_recipes(limit=args.limit)
+    # The corpus is read once up front so dataset download time is not counted as ingest
+    rows = list(recipes)
+    queries = benchmark_queries(rows, count=args.queries)
+    runner = run_local if args.backend == "local" else run_weaviate
+    result = runner(variant, args, boot, sample, rows, queries)
+    result["peak_rss_mb"] = _peak_rss_mb()
+    return result
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark ingest and query for the pipeline variants.")
+    parser.add_argument("--variants", default="st,hf", help=f"comma separated, from {', '.join(VARIANTS)}")
+    parser.add_argument("--backend", choices=("local", "weaviate"), default="local")
+    parser.add_argument("--limit", type=int, default=LIMIT, help="recipes to ingest")
+    parser.add_argument("--queries", type=int, default=QUERIES)
+    parser.add_argument("--k", type=int, default=K)
+    parser.add_argument("--alpha", type=float, default=HYBRID_ALPHA)
+    parser.add_argument("--concurrency", default=",".join(map(str, CONCURRENCY)), help="comma separated levels for QPS")
+    parser.add_argument("--output", help="append one JSON object per variant to this file")
+    parser.add_argument("--index-dir", help="keep the local indexes here instead of a temporary directory")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--grpc-port", type=int, default=50051)
+    parser.add_argument("--keep", action="store_true", help="keep the Weaviate benchmark collections")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    args.concurrency = [int(level) for level in args.concurrency.split(",")]
+    return args
+
+
+def main(argv=None):
+    boot = bootstrap()
+    boot.load_env()
+    argv = sys.argv[1:] if argv is None else argv
+    args = parse_args(argv)
+    if args.child:
+        print(json.dumps(run_variant(args.child, args)))
+        return
+
+    variants = args.variants.split(",")
+    for variant in variants:
+        if variant not in VARIANTS:
+            raise SystemExit(f"Unknown variant {variant}, expected one of {', '.join(VARIANTS)}")
+
+    commit = _commit()
+    for variant in variants:
+        record = {
+            "variant": variant,
+            "backend": args.backend,
+            "limit": args.limit,
+            "embedding": repr(boot.spec),
+            "commit": commit,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        }
+        if variant == "v4" and args.backend == "local":
+            record["skipped"] = "v4 vectors are computed by Weaviate; use --backend weaviate"
+        else:
+            # A fresh process per variant, so peak RSS and loaded models don't leak between them
+            child = subprocess.run(
+                [sys.executable, "-m", "recipe_search.benchmark", *argv, "--child", variant],
+                capture_output=True,
+                text=True,
+            )
+            if child.returncode:
+                record["error"] = child.stderr.strip().splitlines()[-1] if child.stderr.strip() else f"exit {child.returncode}"
+            else:
+                record.update(json.loads(child.stdout.strip().splitlines()[-1]))
+        print(json.dumps(record, indent=2))
+        if args.output:
+            with open(args.output, "a") as f:
+                f.write(json.dumps(record) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""Shared setup for the scripts and the CLI, done lazily and only once per process.
+
+Every script used to load the .env file, connect to Weaviate Cloud and
+load the embedding model at import time, so even printing ``--help`` paid
+for importing torch, LangChain and the Weaviate client. ``Bootstrap``
+does each of these the first time it is needed and keeps the result, so
+running several commands in one process (``recipe_search.cli.main`` from
+a notebook) loads the model once. The query server, the benchmark and the
+recall report build on it too, so the .env file, the Weaviate connection
+and the model are set up in one place.
+
+Nothing heavy is imported at module level here; keep it that way, since
+:mod:`recipe_search.cli` imports this module to print its help.
+"""
+import os
+
+# Collection each pipeline variant ingests into and queries
+VARIANTS = {"st": "RecipeST", "hf": "RecipeHFE", "v4": "RecipeV4"}
+
+# HTTP connections the Weaviate client keeps open, for concurrent requests in the server
+POOL_CONNECTIONS = 20
+POOL_MAXSIZE = 100
+
+
+class Bootstrap:
+    """Lazily loaded settings, embedding model, Weaviate client and vector stores."""
+
+    def __init__(self):
+        self._env_loaded = False
+        self._spec = None
+        self._model = None
+        self._base_embeddings = None
+        self._embeddings = None
+        self._embedding_cache = None
+        self._encoders = {}
+        self._client = None
+        self._vectorstores = {}
+
+    def load_env(self):
+        if not self._env_loaded:
+            from dotenv import load_dotenv
+
+            load_dotenv()
+            self._env_loaded = True
+
+    def getenv(self, name, default=None):
+        self.load_env()
+        return os.getenv(name, default)
+
+    @property
+    def local(self):
+        """Whether VECTOR_BACKEND=local selects the in-process indexes instead of Weaviate."""
+        return self.getenv('VECTOR_BACKEND', 'weaviate') == 'local'
+
+    @property
+    def spec(self):
+        """The :class:`recipe_search.providers.EmbeddingSpec` from EMBEDDING_MODEL, EMBEDDING_BACKEND and EMBEDDING_DIM."""
+        if self._spec is None:
+            from recipe_search.providers import EmbeddingSpec
+
+            self.load_env()
+            self._spec = EmbeddingSpec.from_env()
+        return self._spec
+
+    def embedding_cache(self):
+        """The on-disk :class:`recipe_search.cache.EmbeddingCache` for the configured model."""
+        if self._embedding_cache is None:
+            from recipe_search.cache import EmbeddingCache
+
+            self._embedding_cache = EmbeddingCache(self.spec.cache_name)
+        return self._embedding_cache
+
+    def model(self):
+        """The ``SentenceTransformer`` of the configured spec, shared by query embeddings and ingest."""
+        if self._model is None:
+            self._model = self.spec.sentence_transformer()
+        return self._model
+
+    def base_embeddings(self):
+        """Query embeddings straight from the model, without the on-disk cache."""
+        if self._base_embeddings is None:
+            self._base_embeddings = self.spec.embeddings(self.model())
+        return self._base_embeddings
+
+    def embeddings(self):
+        """Query embeddings, cached on disk so repeated queries skip the model."""
+        if self._embeddings is None:
+            from recipe_search.cache import CachedEmbeddings
+
+            self._embeddings = CachedEmbeddings(self.base_embeddings(), self.embedding_cache())
+        return self._embeddings
+
+    def batched_embeddings(self):
+        """Cached query embeddings whose misses from concurrent callers are encoded together.
+
+        QUERY_BATCH_SIZE and QUERY_BATCH_WAIT_MS bound the batches.
+        """
+        from recipe_search.batching import BatchedEmbeddings
+        from recipe_search.cache import CachedEmbeddings
+
+        batched = BatchedEmbeddings(
+            self.base_embeddings(),
+            max_batch_size=int(self.getenv('QUERY_BATCH_SIZE', '32')),
+            max_wait_ms=float(self.getenv('QUERY_BATCH_WAIT_MS', '5')),
+        )
+        return CachedEmbeddings(batched, self.embedding_cache())
+
+    def encoder(self, variant):
+        """The ``texts -> vectors`` function the ``st`` or ``hf`` ingest encodes documents with."""
+        if variant not in self._encoders:
+            if variant == "hf":
+                self._encoders[variant] = self.base_embeddings().embed_documents
+            else:
+                self._encoders[variant] = self.spec.encoder(self.model())
+        return self._encoders[variant]
+
+    def _headers(self):
+        apikey = self.getenv('HUGGINGFACE_NEW_APIKEY')
+        # Needed by the HuggingFace vectorizer of RecipeV4
+        return {"X-HuggingFace-Api-Key": apikey} if apikey else None
+
+    def _additional_config(self):
+        from weaviate.classes.init import AdditionalConfig
+        from weaviate.config import ConnectionConfig
+
+        return AdditionalConfig(
+            connection=ConnectionConfig(
+                session_pool_connections=int(self.getenv('WEAVIATE_POOL_CONNECTIONS', POOL_CONNECTIONS)),
+                session_pool_maxsize=int(self.getenv('WEAVIATE_POOL_MAXSIZE', POOL_MAXSIZE)),
+            ),
+        )
+
+    def client(self):
+        """The Weaviate Cloud client, connected on first use."""
+        if self._client is None:
+            import weaviate
+            from weaviate.classes.init import Auth
+
+            self._client = weaviate.connect_to_weaviate_cloud(
+                cluster_url=self.getenv('WEAVIATE_CLUSTER'),
+                auth_credentials=Auth.api_key(self.getenv('WEAVIATE_KEY')),
+                headers=self._headers(),
+                additional_config=self._additional_config(),
+                skip_init_checks=True,
+            )
+        return self._client
+
+    def connect_local(self, host="localhost", port=8080, grpc_port=50051):
+        """Connect to a Weaviate on ``host`` instead of Weaviate Cloud; :meth:`client` returns it afterwards."""
+        import weaviate
+
+        if self._client is not None:
+            self.close()
+        self._client = weaviate.connect_to_local(
+            host=host,
+            port=port,
+            grpc_port=grpc_port,
+            headers=self._headers(),
+            additional_config=self._additional_config(),
+        )
+        return self._client
+
+    def vectorstore(self, name):
+        """The vector store behind collection or alias ``name``.
+
+        With VECTOR_BACKEND=local this is the local index written by the
+        ingest, except for RecipeV4, whose vectors only Weaviate computes.
+        Collections built with another embedding model or dimension are
+        refused.
+        """
+        if name not in self._vectorstores:
+            if self.local and name != VARIANTS["v4"]:
+                from recipe_search.local_index import LocalVectorStore
+
+                vectorstore = LocalVectorStore.load(name, self.embeddings(), spec=self.spec)
+            else:
+                from langchain_weaviate.vectorstores import WeaviateVectorStore
+
+                from recipe_search.providers import check_collection
+                from recipe_search.rebuild import resolve_collection
+
+                index_name = resolve_collection(self.client(), name)
+                check_collection(self.client(), index_name, self.spec)
+                vectorstore = WeaviateVectorStore(
+                    client=self.client(), index_name=index_name, text_key="title", embedding=self.embeddings()
+                )
+            self._vectorstores[name] = vectorstore
+        return self._vectorstores[name]
+
+    def close(self):
+        """Close the Weaviate client and write out the embedding cache; the model stays loaded."""
+        if self._embedding_cache is not None:
+            self._embedding_cache.flush()
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+            self._vectorstores.clear()
+
+
+_bootstrap = None
+
+
+def bootstrap():
+    """Return the process-wide :class:`Bootstrap`."""
+    global _bootstrap
+    if _bootstrap is None:
+        _bootstrap = Bootstrap()
+    return _bootstrap
@@ -0,0 +1,254 @@
+"""Persistent on-disk cache of embeddings keyed by content hash.
+
+Vectors live in a memory-mapped float32 file (``vectors.f32``). Keys are
+the SHA-256 of the model name and the text, so changing the model never
+returns stale vectors, and the raw digest of the key stored in each row
+is kept in a second memory-mapped file (``keys.bin``). ``index.json``
+records the least recently used order; the cache holds at most
+``max_entries`` vectors and when it is full the least recently used row
+is reused.
+
+The query server and an ingest share the cache directory of a model, so
+several processes may use it at once. Writes take an exclusive ``flock``
+on ``.lock`` and only use rows whose stored key is empty, and every read
+checks the stored key of the row, so a row taken over by another process
+is a miss rather than someone else's vector.
+
+Re-ingesting an unchanged corpus only costs hashing and disk reads.
+"""
+import atexit
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+try:
+    import fcntl
+except ImportError:  # Windows: no locking between processes
+    fcntl = None
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "recipe_search", "embeddings")
+MAX_ENTRIES = 100_000
+KEY_BYTES = 32
+
+
+def content_key(model_name, text, kind="document"):
+    """Return the cache key for ``text`` embedded with ``model_name``.
+
+    ``kind`` keeps document and query embeddings apart for models that
+    encode them differently.
+    """
+    return hashlib.sha256(f"{model_name}\0{kind}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Memory-mapped float32 store of embeddings with LRU eviction, safe to share between processes."""
+
+    def __init__(self, model_name, cache_dir=None, max_entries=MAX_ENTRIES):
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.path = os.path.join(cache_dir or os.getenv("EMBEDDING_CACHE_DIR", CACHE_DIR), re.sub(r"[^\w.-]", "_", model_name))
+        self.meta_path = os.path.join(self.path, "meta.json")
+        self.index_path = os.path.join(self.path, "index.json")
+        self.vectors_path = os.path.join(self.path, "vectors.f32")
+        self.keys_path = os.path.join(self.path, "keys.bin")
+        self.dim = None
+        self.vectors = None
+        self.keys = None
+        # (inode, mtime) of meta.json when the files were mapped
+        self.mapped = None
+        # key -> row, least recently used first
+        self.slots = OrderedDict()
+        # Next row to overwrite when the file is full of other processes' rows
+        self.victim = 0
+        self.dirty = False
+        self.lock = threading.Lock()
+        self.lock_file = None
+        with self.lock, self._file_lock(fcntl.LOCK_SH if fcntl else None):
+            self._open()
+        atexit.register(self.flush)
+
+    @contextmanager
+    def _file_lock(self, operation):
+        if fcntl is None:
+            yield
+            return
+        if self.lock_file is None:
+            os.makedirs(self.path, exist_ok=True)
+            self.lock_file = open(os.path.join(self.path, ".lock"), "a")
+        fcntl.flock(self.lock_file, operation)
+        try:
+            yield
+        finally:
+            fcntl.flock(self.lock_file, fcntl.LOCK_UN)
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.meta_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _open(self):
+        """Map the files written by this or another process; return False if there are none for this model."""
+        stat = self._stat()
+        if stat is None:
+            return False
+        if stat == self.mapped:
+            return True
+        with open(self.meta_path) as f:
+            meta = json.load(f)
+        if meta.get("model") != self.model_name or meta.get("capacity") != self.max_entries:
+            # Different model or size cap: start again rather than mixing rows
+            return False
+        self.dim = meta["dim"]
+        self.vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(self.max_entries, self.dim))
+        self.keys = np.memmap(self.keys_path, dtype=np.uint8, mode="r+", shape=(self.max_entries, KEY_BYTES))
+        stored = {bytes(self.keys[row]).hex(): int(row) for row in np.flatnonzero(self.keys.any(axis=1))}
+        order = []
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as f:
+                order = json.load(f).get("entries", [])
+        # Least recently used first as recorded, then rows the index doesn't know yet
+        self.slots = OrderedDict((key, stored[key]) for key, row in order if stored.get(key) == row)
+        for key, row in stored.items():
+            self.slots.setdefault(key, row)
+        self.mapped = stat
+        return True
+
+    def _allocate(self, dim):
+        """Create empty files for vectors of ``dim``, replacing rather than truncating any old ones."""
+        os.makedirs(self.path, exist_ok=True)
+        for path, dtype, width in ((self.vectors_path, np.float32, dim), (self.keys_path, np.uint8, KEY_BYTES)):
+            # Other processes keep their mapping of the old file instead of reading past its end
+            np.memmap(path + ".tmp", dtype=dtype, mode="w+", shape=(self.max_entries, width)).flush()
+            os.replace(path + ".tmp", path)
+        with open(self.meta_path + ".tmp", "w") as f:
+            json.dump({"model": self.model_name, "dim": dim, "capacity": self.max_entries}, f)
+        os.replace(self.meta_path + ".tmp", self.meta_path)
+        if os.path.exists(self.index_path):
+            os.remove(self.index_path)
+        self.slots.clear()
+        self._open()
+
+    def _row(self, key):
+        """Row holding ``key``, or ``None`` if it was never stored or another process reused the row."""
+        row = self.slots.get(key)
+        if row is not None and bytes(self.keys[row]) != bytes.fromhex(key):
+            del self.slots[key]
+            return None
+        return row
+
+    def _free_rows(self):
+        """Rows no process holds, in the order :meth:`_take_row` hands them out."""
+        return np.flatnonzero(~self.keys.any(axis=1))[::-1].tolist()
+
+    def _take_row(self, free):
+        """A row from ``free``, else this process's least recently used row, else the next row in turn."""
+        if free:
+            return free.pop()
+        while self.slots:
+            key, row = self.slots.popitem(last=False)
+            if bytes(self.keys[row]) == bytes.fromhex(key):
+                return row
+        row = self.victim
+        self.victim = (self.victim + 1) % self.max_entries
+        return row
+
+    def get_many(self, keys):
+        """Return a list with the cached vector for each key, or ``None`` on a miss."""
+        with self.lock, self._file_lock(fcntl.LOCK_SH if fcntl else None):
+            if not self._open():
+                return [None] * len(keys)
+            found = []
+            for key in keys:
+                row = self._row(key)
+                if row is None:
+                    found.append(None)
+                else:
+                    self.slots.move_to_end(key)
+                    found.append(np.array(self.vectors[row]))
+            return found
+
+    def put_many(self, keys, vectors):
+        """Store ``vectors`` under ``keys``, evicting the least recently used rows if full."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if len(keys) == 0:
+            return
+        with self.lock, self._file_lock(fcntl.LOCK_EX if fcntl else None):
+            # Another process may have created or replaced the files since they were mapped
+            if not self._open() or self.dim != vectors.shape[1]:
+                self._allocate(vectors.shape[1])
+            # Empty rows on disk, so rows other processes filled since loading are not reused
+            free = self._free_rows()
+            for key, vector in zip(keys, vectors):
+                row = self._row(key)
+                if row is None:
+                    row = self._take_row(free)
+                self.vectors[row] = vector
+                # The key last, so a row is never found with a half written vector
+                self.keys[row] = np.frombuffer(bytes.fromhex(key), dtype=np.uint8)
+                self.slots[key] = row
+                self.slots.move_to_end(key)
+            self.dirty = True
+
+    def flush(self):
+        """Write the vectors, their keys and the LRU order to disk."""
+        with self.lock:
+            if not self.dirty:
+                return
+            with self._file_lock(fcntl.LOCK_EX if fcntl else None):
+                self.vectors.flush()
+                self.keys.flush()
+                tmp_path = self.index_path + ".tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump({"entries": list(self.slots.items())}, f)
+                os.replace(tmp_path, self.index_path)
+            self.dirty = False
+
+    def __len__(self):
+        return len(self.slots)
+
+
+def cached_encoder(encode, cache, kind="document"):
+    """Wrap a ``texts -> vectors`` function so that only cache misses are encoded."""
+    def encode_with_cache(texts):
+        keys = [content_key(cache.model_name, text, kind) for text in texts]
+        vectors = cache.get_many(keys)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            encoded = np.asarray(encode([texts[i] for i in missing]), dtype=np.float32)
+            cache.put_many([keys[i] for i in missing], encoded)
+            for i, vector in zip(missing, encoded):
+                vectors[i] = vector
+        return np.stack(vectors) if vectors else np.empty((0, cache.dim or 0), dtype=np.float32)
+
+    return encode_with_cache
+
+
+class CachedEmbeddings(Embeddings):
+    """LangChain embeddings that go through an :class:`EmbeddingCache`.
+
+    Drop-in replacement for the plain query embeddings in the query
+    scripts and the HuggingFace ingest script.
+    """
+
+    def __init__(self, embeddings, cache):
+        self.embeddings = embeddings
+        self.cache = cache
+        self._encode_documents = cached_encoder(embeddings.embed_documents, cache)
+        self._encode_queries = cached_encoder(
+            lambda texts: [embeddings.embed_query(text) for text in texts], cache, kind="query"
+        )
+
+    def embed_documents(self, texts):
+        return self._encode_documents(list(texts)).tolist()
+
+    def embed_query(self, text):
+        return self._encode_queries([text])[0].tolist()
@@ -0,0 +1,520 @@
+"""Command line entry point for ingest, search, meal planning and RAG.
+
+::
+
+    python -m recipe_search ingest st --mode bluegreen
+    python -m recipe_search query "lunch with high protein potato recipe"
+    python -m recipe_search plan --collection RecipeHFE
+    python -m recipe_search rag "lunch with high protein potato recipe"
+    python -m recipe_search rag-batch questions.txt answers.jsonl
+    python -m recipe_search snapshot export RecipeST recipes.arrow
+    python -m recipe_search snapshot import recipes.arrow --mode bluegreen
+
+Settings come from the .env file as for the scripts, and command line
+options override them. Heavy libraries (torch, LangChain, the Weaviate
+client, datasets) are only imported by the command that needs them,
+through :mod:`recipe_search.bootstrap`, so ``--help`` returns at once.
+``python -m recipe_search.import_time`` checks that this stays true.
+
+:func:`main` can be called repeatedly in one process, e.g. from a
+notebook; the embedding model is loaded by the first command that needs
+it and kept for the later ones.
+"""
+import argparse
+import os
+import sys
+
+from recipe_search.bootstrap import VARIANTS, bootstrap
+
+PROBE_QUERY = "lunch with high protein potato recipe"
+
+
+def _alpha(boot, alpha):
+    if alpha is not None:
+        return alpha
+    from recipe_search.planner import HYBRID_ALPHA
+
+    return float(boot.getenv('SEARCH_ALPHA', HYBRID_ALPHA))
+
+
+def print_results(results, calories=False):
+    """Print recipes as returned by :func:`recipe_search.planner.recipe_results`."""
+    from recipe_search.telemetry import telemetry
+
+    lines = ["\nHere are some meal options for you:\n"]
+    with telemetry().span("result_format", results=len(results)):
+        for i, result in enumerate(results):
+            lines.append(f"Option {i + 1}:")
+            lines.append(f"Title: {result['title']}")
+            lines.append(f"Ingredients: {result['ingredients']}")
+            lines.append(f"Instructions: {result['instructions_list']}")
+            if calories:
+                lines.append(f"Calories: {result['calories']}")
+            lines.append(f"Carbohydrates: {result['carbohydrates_g']} g")
+            lines.append(f"Fat: {result['fat_g']} g")
+            lines.append(f"Protein: {result['protein_g']} g")
+            lines.append("")
+    # Printing is left out of the span, since the terminal sets its speed
+    print("\n".join(lines))
+
+
+def _create_collection(client, name, description, vectorizer, schema):
+    from recipe_search.quantization import vector_index_config_from_env
+    from recipe_search.schema import collection_properties
+
+    return client.collections.create(
+        name=name,
+        # Records the embedding model so queries with another model are refused
+        description=description,
+        vectorizer_config=vectorizer,
+        # Quantization and HNSW parameters come from VECTOR_QUANTIZER and HNSW_*
+        vector_index_config=vector_index_config_from_env(),
+        properties=collection_properties(schema),
+    )
+
+
+def _check_uploaded(client, uploader, count, target_name):
+    """Refuse to promote a new version that is missing recipes, and delete it."""
+    if uploader.failed:
+        client.collections.delete(target_name)
+        raise SystemExit(
+            f"{len(uploader.failed)} of {count} recipes failed to upload; {target_name} was deleted without being promoted. "
+            "Run the bluegreen ingest again."
+        )
+
+
+def ingest(boot, variant, limit=None, mode=None, chunk_size=None, processes=None, snapshot=None):
+    """Ingest the recipe dataset into the collection of ``variant``, as the createEmbeddings scripts do.
+
+    With ``snapshot``, the recipes and their vectors are also written to
+    that Arrow or Parquet file (see :mod:`recipe_search.snapshot`).
+    """
+    import weaviate.classes.config as wvcc
+
+    from recipe_search.cache import cached_encoder
+    from recipe_search.encoding import SHARD_SIZE, ParallelEncoder
+    from recipe_search.ingest import ingest as ingest_rows
+    from recipe_search.ingest import stream_recipes
+    from recipe_search.local_index import LocalIndexWriter
+    from recipe_search.providers import EmbeddingSpec
+    from recipe_search.rebuild import next_version_name, promote, resolve_collection
+    from recipe_search.schema import infer_schema
+    from recipe_search.sync import RecipeSync, recipe_uuid
+    from recipe_search.upload import AdaptiveUploader
+
+    name = VARIANTS[variant]
+    if limit is None and boot.getenv('RECIPE_LIMIT'):
+        limit = int(boot.getenv('RECIPE_LIMIT'))
+    processes = processes or int(boot.getenv('ENCODE_PROCESSES', '1'))
+    # Every chunk is split across the encoder processes, so the default grows with them
+    default_chunk_size = 64 if processes == 1 else processes * SHARD_SIZE
+    chunk_size = chunk_size or int(boot.getenv('INGEST_CHUNK_SIZE', default_chunk_size))
+    mode = mode or boot.getenv('INGEST_MODE', 'full')
+    if snapshot and variant == "v4":
+        raise SystemExit("v4 vectors are computed by Weaviate; export them with `snapshot export RecipeV4` after the ingest")
+    if snapshot and mode == "sync":
+        raise SystemExit("A sync only sees the changed recipes; snapshot with --mode full or bluegreen")
+
+    if variant == "v4":
+        # Weaviate's HuggingFace module embeds the recipes with EMBEDDING_MODEL at full dimension
+        spec = EmbeddingSpec(boot.spec.model_name)
+        encoder = encode = None
+    else:
+        spec = boot.spec
+        if processes > 1:
+            # Shard every chunk across worker processes, each with its own copy of the model
+            encoder = ParallelEncoder(spec.model_name, processes=processes, normalize=True, model_kwargs=spec.model_kwargs())
+        else:
+            encoder = boot.encoder(variant)
+        # Unchanged recipes are read back from the on-disk cache instead of being re-encoded
+        encode = cached_encoder(encoder, boot.embedding_cache())
+
+    # Stream the dataset instead of materialising the whole split
+    sample, recipes = stream_recipes(limit=limit)
+    # Nutrition columns are stored as numbers so searches can filter on them
+    schema = infer_schema(sample)
+
+    def with_snapshot(batch):
+        if not snapshot:
+            return batch
+        from recipe_search.snapshot import SnapshotWriter, TeeBatch
+
+        return TeeBatch(batch, SnapshotWriter(snapshot, schema=schema, metadata={**spec.metadata(), "vectorizer": "none"}))
+
+    try:
+        if boot.local and variant != "v4":
+            # Write an in-process index under LOCAL_INDEX_DIR instead of uploading to Weaviate
+            writer = with_snapshot(LocalIndexWriter(metadata=spec.metadata()))
+            ingest_rows(writer, name, recipes, encode=encode, chunk_size=chunk_size, uuid_for=recipe_uuid, schema=schema)
+            print("Local index written successfully.")
+            return
+
+        client = boot.client()
+        if variant == "v4":
+            vectorizer = wvcc.Configure.Vectorizer.text2vec_huggingface(model=spec.model_name, vectorize_collection_name=True)
+        else:
+            # The embeddings are computed here and uploaded as the object vectors
+            vectorizer = wvcc.Configure.Vectorizer.none()
+
+        def create_collection(collection_name):
+            return _create_collection(client, collection_name, spec.description(), vectorizer, schema)
+
+        sync = RecipeSync(name)
+        live_name = resolve_collection(client, name)
+        if mode == "sync" and client.collections.exists(live_name):
+            target_name = live_name
+            collection = client.collections.get(live_name)
+        elif mode == "bluegreen":
+            # Build a new version next to the live one; readers switch once it is validated
+            target_name = next_version_name(client, name)
+            sync.reset()
+            collection = create_collection(target_name)
+        else:
+            target_name = live_name
+            client.collections.delete(target_name)
+            sync.reset()
+            collection = create_collection(target_name)
+
+        if variant == "v4":
+            # Every object costs a call to the Hugging Face inference API, so start with small
+            # requests; the uploader raises concurrency until the API starts throttling
+            uploader = AdaptiveUploader(client, batch_size=10, concurrency=1)
+        else:
+            # Retries throttled objects and adapts the number of concurrent requests to the server
+            uploader = AdaptiveUploader(client)
+
+        count = ingest_rows(
+            with_snapshot(uploader),
+            target_name,
+            sync.changed(recipes),
+            encode=encode,
+            chunk_size=chunk_size,
+            uuid_for=recipe_uuid,
+            schema=schema,
+        )
+        if mode == "bluegreen":
+            # The manifest is only saved once the new version is live, so a refused one leaves the old intact
+            _check_uploaded(client, uploader, count, target_name)
+            if encode is None:
+                probe = {"probe_text": PROBE_QUERY}
+            else:
+                probe = {"probe_vector": encode([PROBE_QUERY])[0]}
+            promote(client, name, target_name, expected_count=count, **probe)
+        sync.commit(collection, failed=uploader.failed)
+        print("Data uploaded successfully.")
+    finally:
+        if processes > 1 and encoder is not None:
+            encoder.close()
+
+
+def query(boot, text, collection=VARIANTS["st"], k=3, alpha=None):
+    """Print the top ``k`` recipes for ``text``."""
+    from recipe_search.planner import hybrid_kwargs, recipe_results, search_recipes
+
+    # Hybrid search: alpha 1 is pure vector search, 0 pure keyword search on title and ingredients
+    timings = {}
+    results = search_recipes(boot.vectorstore(collection), text, k=k, timings=timings, **hybrid_kwargs(_alpha(boot, alpha)))
+    print(f"Embedding took {timings['embed_ms']} ms, search took {timings['search_ms']} ms")
+    print_results(recipe_results(results))
+    return results
+
+
+def plan(boot, collection=VARIANTS["st"], k=4, alpha=None, filter_nutrition=None, rerank=None, fetch_k=None, mmr_lambda=None):
+    """Interactive meal planner: ask for the meal, search, repeat.
+
+    ``rerank``, ``fetch_k`` and ``mmr_lambda`` override RERANK,
+    RERANK_FETCH_K and MMR_LAMBDA (see :mod:`recipe_search.rerank`).
+    Results are cached in PLAN_CACHE_PATH like the server caches them.
+    """
+    import time
+
+    from recipe_search.planner import hybrid_kwargs, meal_query, nutrition_conditions, nutrition_filters, recipe_results
+    from recipe_search.rerank import Reranker
+    from recipe_search.result_cache import ResultCache
+    from recipe_search.telemetry import telemetry
+
+    vectorstore = boot.vectorstore(collection)
+    if filter_nutrition is None:
+        # Nutrition goals such as "high-protein" filter on the numeric nutrition fields
+        filter_nutrition = boot.getenv('NUTRITION_FILTERS', '1') != '0'
+    alpha = _alpha(boot, alpha)
+    search_kwargs = hybrid_kwargs(alpha)
+    # Fetch more candidates than shown and drop near-duplicate recipes
+    boot.load_env()
+    reranker = Reranker.from_env(rerank, fetch_k, mmr_lambda)
+    # Repeated or near-identical meal queries are answered without searching
+    plan_cache = ResultCache(
+        ttl=float(boot.getenv('RESULT_CACHE_TTL', '3600')),
+        threshold=float(boot.getenv('RESULT_CACHE_THRESHOLD', '0.95')),
+        path=boot.getenv('PLAN_CACHE_PATH', '.plan_cache.json'),
+    )
+
+    print("Welcome to the Meal Planner!")
+    while True:
+        meal_type = input("Enter the type of meal (e.g., breakfast, lunch, dinner, main dish): ")
+        ingredients = input("Do you have any specific ingredients for your dish? (leave blank if you don't have any preference): ")
+        nutrition_goals = input("Enter specific nutritional goals (e.g., low-carb, high-protein): ")
+        any_other = input("Do you have any other preference? (leave blank if you don't have any preference): ")
+        text = meal_query(meal_type, ingredients, nutrition_goals, any_other)
+
+        conditions = nutrition_conditions(nutrition_goals) if filter_nutrition else []
+        timings = {}
+
+        def embed(text):
+            start = time.perf_counter()
+            with telemetry().span("query_embed"):
+                vector = vectorstore.embeddings.embed_query(text)
+            timings["query_embed_ms"] = round((time.perf_counter() - start) * 1000, 2)
+            return vector
+
+        def run_search(text, vector):
+            results = reranker.search(
+                vectorstore, text, k=k, vector=vector, filters=nutrition_filters(conditions), timings=timings, **search_kwargs
+            )
+            return recipe_results(results)
+
+        # The cache file outlives the settings: other models, filters or weights must not share results
+        namespace = f"plan:{boot.spec.cache_name}:{collection}:{k}:{alpha}:{reranker!r}:" + ",".join(
+            f"{field}{op}{value}" for field, op, value in conditions
+        )
+        results = plan_cache.get_or_compute(text, run_search, embed=embed, namespace=namespace)
+        plan_cache.save()
+        if "search_ms" in timings:
+            rerank_timing = f", rerank {timings['rerank_ms']} ms" if "rerank_ms" in timings else ""
+            print(f"\n(embedding {timings['query_embed_ms']} ms, search {timings['search_ms']} ms{rerank_timing})")
+        else:
+            print("\n(from the result cache)")
+        print_results(results, calories=True)
+
+        another = input("Do you want to plan another meal? (yes/no): ")
+        if another.lower() != "yes":
+            break
+
+
+def _llm(boot):
+    from langchain_openai import ChatOpenAI
+
+    return ChatOpenAI(model="gpt-3.5-turbo", temperature=0, api_key=boot.getenv("OPENAI_API_KEY"))
+
+
+def _context_builder(boot, report=None):
+    from recipe_search.context import ContextBuilder
+
+    # Only the displayed recipe fields go into the prompt, within a token budget
+    return ContextBuilder(max_tokens=int(boot.getenv('RAG_CONTEXT_TOKENS', '1500')), report=report)
+
+
+def rag(boot, question, stream=None, alpha=None):
+    """Answer ``question`` with the RAG chain over RecipeV4, as ``Vectoriser/ragPipeline.py`` does."""
+    from recipe_search.planner import RETURN_PROPERTIES, hybrid_kwargs
+    from recipe_search.rag import LatencyReport, build_rag_chain, stream_answer
+    from recipe_search.result_cache import ResultCache
+
+    # Only the properties used in the prompt are fetched
+    retriever = boot.vectorstore(VARIANTS["v4"]).as_retriever(
+        search_kwargs={"return_properties": list(RETURN_PROPERTIES), **hybrid_kwargs(_alpha(boot, alpha))}
+    )
+    chain = build_rag_chain(retriever, _llm(boot), context_builder=_context_builder(boot, report=print))
+    embed = boot.embeddings().embed_query
+
+    # Answers are reused for repeated or near-identical questions, skipping retrieval and the LLM
+    answer_cache = ResultCache(path=boot.getenv('RAG_CACHE_PATH', '.rag_answer_cache.json'))
+    # The cache file outlives the model: questions embedded with another one must not match
+    namespace = f"rag:{boot.spec.cache_name}"
+    # Print how long retrieval, the first token and the whole LLM call took
+    run_config = {"callbacks": [LatencyReport(print)]}
+    if stream is None:
+        stream = boot.getenv('RAG_STREAM', '1') == '1'
+    if stream:
+        for chunk in stream_answer(chain, question, cache=answer_cache, embed=embed, namespace=namespace, config=run_config):
+            print(chunk, end="", flush=True)
+        print()
+    else:
+        output = answer_cache.get_or_compute(
+            question, lambda question, vector: chain.invoke(question, config=run_config), embed=embed, namespace=namespace
+        )
+        print(output)
+    answer_cache.save()
+
+
+def rag_batch(boot, questions_path, output_path, concurrency=None, alpha=None):
+    """Answer a file of questions concurrently over the async client, as ``Vectoriser/ragBatch.py`` does."""
+    import asyncio
+
+    import weaviate
+    from weaviate.classes.init import Auth
+
+    from recipe_search.providers import acheck_collection
+    from recipe_search.rag import AsyncWeaviateRetriever, answer_file, build_rag_chain
+    from recipe_search.rebuild import aresolve_collection
+
+    concurrency = concurrency or int(boot.getenv('RAG_CONCURRENCY', '16'))
+    alpha = _alpha(boot, alpha)
+
+    async def run():
+        # The async client lets searches run without blocking each other
+        client = weaviate.use_async_with_weaviate_cloud(
+            cluster_url=boot.getenv('WEAVIATE_CLUSTER'),
+            auth_credentials=Auth.api_key(boot.getenv('WEAVIATE_KEY')),
+            skip_init_checks=True,
+        )
+        await client.connect()
+        try:
+            index_name = await aresolve_collection(client, VARIANTS["v4"])
+            # Refuse a collection built with a different embedding model or dimension
+            await acheck_collection(client, index_name, boot.spec)
+            retriever = AsyncWeaviateRetriever(client=client, index_name=index_name, embeddings=boot.embeddings(), alpha=alpha)
+            chain = build_rag_chain(retriever, _llm(boot), context_builder=_context_builder(boot))
+            await answer_file(chain, questions_path, output_path, concurrency=concurrency)
+        finally:
+            await client.close()
+
+    asyncio.run(run())
+
+
+def snapshot_export(boot, collection, path):
+    """Write ``collection`` (its live version) with its vectors to an Arrow or Parquet snapshot."""
+    from recipe_search.snapshot import export_collection, export_local_index
+
+    if boot.local and collection != VARIANTS["v4"]:
+        count = export_local_index(collection, path)
+    else:
+        from recipe_search.rebuild import resolve_collection
+
+        count = export_collection(boot.client(), resolve_collection(boot.client(), collection), path)
+    print(f"Exported {count} recipes from {collection}.")
+
+
+def snapshot_import(boot, path, collection=None, mode=None):
+    """Build a collection from a snapshot, uploading the stored vectors instead of encoding the recipes.
+
+    ``collection`` defaults to the collection the snapshot was taken
+    from. ``mode`` is ``full`` (replace the live collection, the default)
+    or ``bluegreen`` (build a new version and point the alias at it).
+    """
+    import re
+
+    import weaviate.classes.config as wvcc
+
+    from recipe_search.local_index import LocalIndexWriter
+    from recipe_search.rebuild import next_version_name, promote, resolve_collection
+    from recipe_search.snapshot import import_snapshot, read_snapshot
+    from recipe_search.sync import RecipeSync
+    from recipe_search.upload import AdaptiveUploader
+
+    snapshot = read_snapshot(path)
+    # Snapshots of a versioned collection restore the alias, e.g. RecipeST_v3 -> RecipeST
+    name = collection or re.sub(r"_v\d+$", "", snapshot.metadata["collection"])
+    mode = mode or 'full'
+    spec = snapshot.spec
+    # The manifest describes the replaced collection; the next sync uploads every recipe once
+    manifest = RecipeSync(name).path
+    if os.path.exists(manifest):
+        os.remove(manifest)
+
+    if boot.local and name != VARIANTS["v4"]:
+        with LocalIndexWriter(metadata=spec.metadata()) as writer:
+            import_snapshot(writer, name, snapshot)
+        return
+
+    client = boot.client()
+    if snapshot.metadata.get("vectorizer") == "text2vec-huggingface":
+        # Keep the server side vectorizer for recipes added later; the stored vectors are used as they are
+        vectorizer = wvcc.Configure.Vectorizer.text2vec_huggingface(model=spec.model_name, vectorize_collection_name=True)
+    else:
+        vectorizer = wvcc.Configure.Vectorizer.none()
+    if mode == "bluegreen":
+        target_name = next_version_name(client, name)
+    else:
+        target_name = resolve_collection(client, name)
+        client.collections.delete(target_name)
+    _create_collection(client, target_name, spec.description(), vectorizer, snapshot.schema)
+
+    uploader = AdaptiveUploader(client)
+    with uploader:
+        count = import_snapshot(uploader, target_name, snapshot)
+    if mode == "bluegreen":
+        _check_uploaded(client, uploader, count, target_name)
+        probe_vector = snapshot.vectors()[0] if len(snapshot) else None
+        promote(client, name, target_name, expected_count=count, probe_vector=probe_vector)
+    elif uploader.failed:
+        print(f"{len(uploader.failed)} of {count} recipes failed to upload.")
+    print(f"Imported {count} recipes into {target_name}.")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m recipe_search", description="Recipe search and meal planning.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest_parser = commands.add_parser("ingest", help="embed the recipe dataset and upload it")
+    ingest_parser.add_argument("variant", choices=VARIANTS, help="st: SentenceTransformers, hf: HuggingFace, v4: Weaviate vectorizer")
+    ingest_parser.add_argument("--limit", type=int, help="only ingest the first N recipes (RECIPE_LIMIT)")
+    ingest_parser.add_argument("--mode", choices=("full", "sync", "bluegreen"), help="INGEST_MODE, default full")
+    ingest_parser.add_argument("--chunk-size", type=int, help="INGEST_CHUNK_SIZE, default 64 or 256 per process")
+    ingest_parser.add_argument("--processes", type=int, help="ENCODE_PROCESSES, default 1")
+    ingest_parser.add_argument("--snapshot", help="also write the recipes and vectors to this .arrow or .parquet file")
+
+    query_parser = commands.add_parser("query", help="search for recipes")
+    query_parser.add_argument("text", nargs="?", default=PROBE_QUERY)
+    query_parser.add_argument("--collection", choices=VARIANTS.values(), default=VARIANTS["st"])
+    query_parser.add_argument("--k", type=int, default=3)
+    query_parser.add_argument("--alpha", type=float, help="SEARCH_ALPHA, 1 is pure vector and 0 pure keyword search")
+
+    plan_parser = commands.add_parser("plan", help="interactive meal planner")
+    plan_parser.add_argument("--collection", choices=VARIANTS.values(), default=VARIANTS["st"])
+    plan_parser.add_argument("--k", type=int, default=4)
+    plan_parser.add_argument("--alpha", type=float, help="SEARCH_ALPHA, 1 is pure vector and 0 pure keyword search")
+    plan_parser.add_argument(
+        "--no-nutrition-filters", dest="filter_nutrition", action="store_const", const=False, help="NUTRITION_FILTERS=0"
+    )
+    plan_parser.add_argument("--rerank", choices=("none", "mmr", "cross-encoder"), help="RERANK, default mmr")
+    plan_parser.add_argument("--fetch-k", type=int, help="candidates fetched before reranking (RERANK_FETCH_K, default 20)")
+    plan_parser.add_argument("--mmr-lambda", type=float, help="1 is pure relevance, 0 pure diversity (MMR_LAMBDA, default 0.7)")
+
+    rag_parser = commands.add_parser("rag", help="answer a question with the RAG chain over RecipeV4")
+    rag_parser.add_argument("question", nargs="?", default=PROBE_QUERY)
+    rag_parser.add_argument("--no-stream", dest="stream", action="store_const", const=False, help="RAG_STREAM=0")
+    rag_parser.add_argument("--alpha", type=float, help="SEARCH_ALPHA, 1 is pure vector and 0 pure keyword search")
+
+    batch_parser = commands.add_parser("rag-batch", help="answer a file of questions, one per line")
+    batch_parser.add_argument("questions", nargs="?", default="questions.txt")
+    batch_parser.add_argument("output", nargs="?", default="answers.jsonl")
+    batch_parser.add_argument("--concurrency", type=int, help="RAG_CONCURRENCY, default 16")
+    batch_parser.add_argument("--alpha", type=float, help="SEARCH_ALPHA, 1 is pure vector and 0 pure keyword search")
+
+    snapshot_parser = commands.add_parser("snapshot", help="export or import Arrow/Parquet snapshots of a collection")
+    snapshot_commands = snapshot_parser.add_subparsers(dest="snapshot_command", required=True)
+    export_parser = snapshot_commands.add_parser("export", help="write a collection and its vectors to a file")
+    export_parser.add_argument("collection", choices=VARIANTS.values())
+    export_parser.add_argument("path", help=".arrow (memory-mapped on import) or .parquet (compressed)")
+    import_parser = snapshot_commands.add_parser("import", help="build a collection from a snapshot without encoding")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--collection", choices=VARIANTS.values(), help="default: the collection the snapshot was taken from")
+    import_parser.add_argument("--mode", choices=("full", "bluegreen"), default="full")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(sys.argv[1:] if argv is None else argv)
+    boot = bootstrap()
+    try:
+        if args.command == "ingest":
+            ingest(boot, args.variant, args.limit, args.mode, args.chunk_size, args.processes, args.snapshot)
+        elif args.command == "query":
+            query(boot, args.text, args.collection, args.k, args.alpha)
+        elif args.command == "plan":
+            plan(boot, args.collection, args.k, args.alpha, args.filter_nutrition, args.rerank, args.fetch_k, args.mmr_lambda)
+        elif args.command == "rag":
+            rag(boot, args.question, args.stream, args.alpha)
+        elif args.command == "snapshot" and args.snapshot_command == "export":
+            snapshot_export(boot, args.collection, args.path)
+        elif args.command == "snapshot":
+            snapshot_import(boot, args.path, args.collection, args.mode)
+        else:
+            rag_batch(boot, args.questions, args.output, args.concurrency, args.alpha)
+    finally:
+        boot.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Compact RAG context: relevant fields only, deduplicated, within a token budget.
+
+Passing retriever output straight into the prompt stringifies whole
+``Document`` objects with every recipe property, which makes prompts long
+and slow. ``ContextBuilder`` keeps only the fields the answer needs,
+drops duplicate recipes and packs recipes in retrieval order until the
+token budget is used up. Tokens are counted locally with tiktoken, which
+langchain-openai already depends on.
+"""
+import re
+
+import tiktoken
+
+from recipe_search.planner import DISPLAY_FIELDS
+
+MODEL_NAME = "gpt-3.5-turbo"
+MAX_CONTEXT_TOKENS = 1500
+
+FIELD_LABELS = {
+    "ingredients": "Ingredients",
+    "instructions_list": "Instructions",
+    "calories": "Calories",
+    "carbohydrates_g": "Carbohydrates (g)",
+    "fat_g": "Fat (g)",
+    "protein_g": "Protein (g)",
+}
+
+
+def _title_key(title):
+    return " ".join(re.sub(r"[^\w\s]", " ", title.lower()).split())
+
+
+class ContextBuilder:
+    """Turns retrieved recipe documents into a compact context string."""
+
+    def __init__(self, max_tokens=MAX_CONTEXT_TOKENS, fields=DISPLAY_FIELDS, model_name=MODEL_NAME, report=None):
+        self.max_tokens = max_tokens
+        self.fields = fields
+        self.encoding = tiktoken.encoding_for_model(model_name)
+        # Called with a dict of token counts for every request
+        self.report = report
+
+    def count_tokens(self, text):
+        return len(self.encoding.encode(text))
+
+    def format_recipe(self, document):
+        lines = [f"Title: {document.page_content}"]
+        for field in self.fields:
+            value = document.metadata.get(field)
+            if value not in (None, ""):
+                lines.append(f"{FIELD_LABELS.get(field, field)}: {value}")
+        return "\n".join(lines)
+
+    def build(self, documents):
+        """Return the context for ``documents``, at most ``max_tokens`` tokens long."""
+        seen = set()
+        blocks = []
+        used = 0
+        for document in documents:
+            key = _title_key(document.page_content)
+            if key in seen:
+                continue
+            seen.add(key)
+
+            block = self.format_recipe(document)
+            tokens = self.encoding.encode(block)
+            # Blocks are joined with a blank line, which costs a token
+            cost = len(tokens) + (1 if blocks else 0)
+            if used + cost > self.max_tokens:
+                if not blocks:
+                    # Keep a truncated first recipe rather than an empty context
+                    blocks.append(self.encoding.decode(tokens[:self.max_tokens]))
+                    used = self.max_tokens
+                break
+            blocks.append(block)
+            used += cost
+
+        if self.report is not None:
+            self.report({"retrieved": len(documents), "recipes": len(blocks), "context_tokens": used})
+        return "\n\n".join(blocks)
+
+    def measure_prompt(self, prompt_value):
+        """Report the token count of the final prompt and pass it through unchanged."""
+        if self.report is not None:
+            self.report({"prompt_tokens": sum(self.count_tokens(message.content) for message in prompt_value.to_messages())})
+        return prompt_value
@@ -0,0 +1,111 @@
+"""Multi-process SentenceTransformer encoding for CPU ingest hosts.
+
+A single ``model.encode`` call only keeps a few cores busy. ``ParallelEncoder``
+keeps one model per worker process and splits every chunk of texts into
+one shard per worker, so a chunk keeps them all busy. Texts are sorted by
+length before sharding so each shard pads to a similar length, and the
+vectors are put back in input order afterwards.
+
+Workers are started with ``spawn`` rather than forked: the CLI may already
+have loaded torch and started its threads (e.g. after a ``query`` in the
+same process), and a forked copy of those can deadlock. Spawned workers
+import the main module again, so scripts that ingest must call
+:func:`recipe_search.cli.main` under an ``if __name__ == "__main__"``
+guard.
+"""
+import math
+import multiprocessing
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+BATCH_SIZE = 32
+# Fewest texts sent to a worker per task; smaller shards cost more in messaging than they save
+MIN_SHARD_SIZE = 16
+# Texts per worker to aim for in every chunk
+SHARD_SIZE = 256
+
+_model = None
+
+
+def _init_worker(model_name, threads, model_kwargs):
+    global _model
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    torch.set_num_threads(threads)
+    _model = SentenceTransformer(model_name, **(model_kwargs or {"device": "cpu"}))
+
+
+def _ready():
+    return os.getpid()
+
+
+def _encode_shard(texts, batch_size, normalize):
+    start = time.perf_counter()
+    vectors = _model.encode(texts, batch_size=batch_size, normalize_embeddings=normalize, convert_to_numpy=True)
+    return os.getpid(), len(texts), time.perf_counter() - start, vectors.astype(np.float32, copy=False)
+
+
+class ParallelEncoder:
+    """Callable ``texts -> vectors`` encoder backed by a pool of worker processes.
+
+    Every call is split into ``processes`` shards of at least
+    ``min_shard_size`` texts. ``model_kwargs`` are passed to ``SentenceTransformer``, e.g. from
+    :meth:`recipe_search.providers.EmbeddingSpec.model_kwargs`.
+    """
+
+    def __init__(
+        self, model_name, processes=None, batch_size=BATCH_SIZE, min_shard_size=MIN_SHARD_SIZE, normalize=False, model_kwargs=None
+    ):
+        self.processes = processes or os.cpu_count()
+        self.batch_size = batch_size
+        self.min_shard_size = min_shard_size
+        self.normalize = normalize
+        threads = max(1, (os.cpu_count() or 1) // self.processes)
+        self.pool = ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(model_name, threads, model_kwargs),
+        )
+        # Start every worker now and wait for the models to load
+        for future in [self.pool.submit(_ready) for _ in range(self.processes)]:
+            future.result()
+        # pid -> [documents, seconds]
+        self.stats = defaultdict(lambda: [0, 0.0])
+
+    def __call__(self, texts):
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        order = np.argsort([len(text) for text in texts], kind="stable")
+        shard_size = max(self.min_shard_size, math.ceil(len(texts) / self.processes))
+        futures = []
+        for start in range(0, len(order), shard_size):
+            rows = order[start:start + shard_size]
+            futures.append((rows, self.pool.submit(_encode_shard, [texts[i] for i in rows], self.batch_size, self.normalize)))
+
+        vectors = None
+        for rows, future in futures:
+            pid, count, seconds, shard = future.result()
+            if vectors is None:
+                vectors = np.empty((len(texts), shard.shape[1]), dtype=np.float32)
+            vectors[rows] = shard
+            self.stats[pid][0] += count
+            self.stats[pid][1] += seconds
+        return vectors
+
+    def report(self):
+        """Print the throughput of every worker."""
+        total_docs = 0
+        for pid, (docs, seconds) in sorted(self.stats.items()):
+            total_docs += docs
+            print(f"Worker {pid}: {docs} docs in {seconds:.1f}s ({docs / seconds if seconds else 0:.1f} docs/sec)")
+        print(f"{total_docs} docs encoded by {len(self.stats)} workers.")
+
+    def close(self):
+        self.pool.shutdown()
+        self.report()
@@ -0,0 +1,97 @@
+"""Import-time benchmark for the command line entry point.
+
+Runs ``python -m recipe_search --help`` in fresh processes and reports
+its median wall time, the slowest modules it imports (from ``python -X
+importtime``) and any heavy library that was imported although ``--help``
+needs none of them. Exits with status 1 when a heavy library is imported
+or the median is over ``--max-ms``, so it can run as a regression check::
+
+    python -m recipe_search.import_time --runs 5 --max-ms 500
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+# Libraries that only the commands themselves may import
+HEAVY_MODULES = (
+    "datasets",
+    "langchain",
+    "langchain_core",
+    "langchain_huggingface",
+    "langchain_openai",
+    "langchain_weaviate",
+    "numpy",
+    "sentence_transformers",
+    "sklearn",
+    "tiktoken",
+    "torch",
+    "transformers",
+    "weaviate",
+)
+
+COMMAND = ("-m", "recipe_search", "--help")
+RUNS = 5
+MAX_MS = 500.0
+TOP = 10
+
+
+def wall_times(runs=RUNS, command=COMMAND):
+    """Wall time in milliseconds of ``runs`` fresh runs of ``python <command>``."""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *command], capture_output=True, check=True)
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def import_profile(command=COMMAND):
+    """Return ``{module: cumulative microseconds}`` for every module ``python <command>`` imports."""
+    result = subprocess.run([sys.executable, "-X", "importtime", *command], capture_output=True, text=True, check=True)
+    modules = {}
+    for line in result.stderr.splitlines():
+        # import time:       self [us] |  cumulative | imported package
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = int(cumulative)
+    return modules
+
+
+def heavy_imports(modules, heavy=HEAVY_MODULES):
+    return sorted(name for name in modules if name.split(".")[0] in heavy)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check that the CLI starts without importing heavy libraries.")
+    parser.add_argument("--runs", type=int, default=RUNS)
+    parser.add_argument("--max-ms", type=float, default=MAX_MS, help="fail when the median wall time is higher")
+    parser.add_argument("--top", type=int, default=TOP, help="number of slowest imports to show")
+    args = parser.parse_args(argv)
+
+    modules = import_profile()
+    times = wall_times(args.runs)
+    heavy = heavy_imports(modules)
+    # Only top-level names, since packages include the time of their submodules
+    slowest = sorted(((us, name) for name, us in modules.items() if "." not in name), reverse=True)[:args.top]
+    report = {
+        "command": " ".join(["python", *COMMAND]),
+        "median_ms": round(statistics.median(times), 1),
+        "max_ms": round(max(times), 1),
+        "modules": len(modules),
+        "slowest_imports_ms": {name: round(us / 1000, 1) for us, name in slowest},
+        "heavy_imports": heavy,
+    }
+    print(json.dumps(report, indent=2))
+
+    if heavy:
+        raise SystemExit(f"--help imports {', '.join(heavy)}; import them inside the command that needs them")
+    if report["median_ms"] > args.max_ms:
+        raise SystemExit(f"--help took {report['median_ms']} ms, over the {args.max_ms} ms budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Streaming ingest pipeline shared by the createEmbeddings scripts.
+
+The pipeline is a chain of generators:
+
+    dataset iterator -> text builder -> batched encoder -> uploader
+
+Recipes are read from the Hugging Face hub in streaming mode, so memory
+stays bounded no matter how large the corpus is: the pipeline holds at
+most ``chunk_size * (prefetch + 2)`` recipes, plus what the batch buffers
+(about three windows of 2000 objects for
+:class:`recipe_search.upload.AdaptiveUploader`). Encoding runs in a
+background thread and the uploader sends from another, so the next
+chunks are encoded while earlier ones are being uploaded.
+"""
+import itertools
+import queue
+import threading
+
+from datasets import load_dataset
+
+from recipe_search.schema import SKIP_COLUMNS, coerce_properties
+from recipe_search.telemetry import telemetry
+
+DATASET_NAME = "Shengtao/recipe"
+CHUNK_SIZE = 64
+PREFETCH = 2
+
+
+def stream_recipes(dataset_name=DATASET_NAME, split="train", limit=None):
+    """Return the first recipe, to infer the schema from, and a lazy iterator over all recipes."""
+    with telemetry().span("dataset_load", dataset=dataset_name):
+        recipes = load_dataset(dataset_name, split=split, streaming=True)
+        if limit is not None:
+            recipes = recipes.take(limit)
+
+        rows = iter(recipes)
+        first = next(rows, None)
+    if first is None:
+        return {}, iter(())
+    return first, itertools.chain([first], rows)
+
+
+def recipe_text(recipe):
+    """Build the text that is embedded for a recipe."""
+    return " ".join([f"{key}: {value}" for key, value in recipe.items() if key not in SKIP_COLUMNS])
+
+
+def recipe_properties(recipe, schema=None):
+    """Build the Weaviate properties for a recipe, typed by ``schema`` if given."""
+    if schema is not None:
+        return coerce_properties(recipe, schema)
+    return {key: str(value) for key, value in recipe.items() if key not in SKIP_COLUMNS}
+
+
+def chunked(rows, size=CHUNK_SIZE):
+    """Group an iterator into lists of at most ``size`` items."""
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def encode_chunks(chunks, encode=None):
+    """Yield ``(recipes, vectors)`` pairs, encoding each chunk in a single call.
+
+    ``encode`` takes a list of texts and returns one vector per text. When it
+    is ``None`` the vectors are left to the server side vectorizer.
+    """
+    for chunk in chunks:
+        if encode is None:
+            yield chunk, None
+            continue
+        with telemetry().span("text_assembly", recipes=len(chunk)):
+            texts = [recipe_text(recipe) for recipe in chunk]
+        with telemetry().span("encode", recipes=len(chunk)):
+            vectors = encode(texts)
+        yield chunk, vectors
+
+
+def prefetch(items, depth=PREFETCH):
+    """Consume ``items`` in a background thread, keeping at most ``depth`` ready."""
+    buffer = queue.Queue(maxsize=depth)
+    done = object()
+    failure = []
+
+    def produce():
+        try:
+            for item in items:
+                buffer.put(item)
+        except BaseException as e:
+            failure.append(e)
+        finally:
+            buffer.put(done)
+
+    worker = threading.Thread(target=produce, daemon=True)
+    worker.start()
+    while True:
+        item = buffer.get()
+        if item is done:
+            break
+        yield item
+    worker.join()
+    if failure:
+        raise failure[0]
+
+
+def upload(batch, collection_name, encoded_chunks, uuid_for=None, schema=None):
+    """Add every encoded chunk to an open Weaviate batch and return the object count.
+
+    Client side embeddings are sent as the object vector rather than as a
+    property. The batch goes over gRPC, which packs each vector as float32
+    bytes, and the vector is what the HNSW index and ``similarity_search``
+    use.
+
+    ``uuid_for`` maps a recipe to its object UUID; objects get a random
+    UUID when it is ``None``. ``schema`` is the ``{column: DataType}``
+    mapping from :func:`recipe_search.schema.infer_schema`.
+    """
+    count = 0
+    for chunk, vectors in encoded_chunks:
+        with telemetry().span("upload", recipes=len(chunk)):
+            for index, recipe in enumerate(chunk):
+                vector = vectors[index] if vectors is not None else None
+                uuid = uuid_for(recipe) if uuid_for is not None else None
+                batch.add_object(collection=collection_name, properties=recipe_properties(recipe, schema), vector=vector, uuid=uuid)
+        count += len(chunk)
+        print(f"Queued {count} recipes for {collection_name}.")
+    return count
+
+
+def ingest(batch, collection_name, rows, encode=None, chunk_size=CHUNK_SIZE, prefetch_depth=PREFETCH, uuid_for=None, schema=None):
+    """Stream ``rows`` through the encoder into ``collection_name``.
+
+    ``batch`` is a batch context manager such as
+    :class:`recipe_search.upload.AdaptiveUploader` or
+    ``weaviate_client.batch.dynamic()``.
+    """
+    # Reading the streamed dataset happens lazily, one chunk at a time
+    chunks = telemetry().timed("dataset_load", chunked(rows, chunk_size))
+    encoded_chunks = prefetch(encode_chunks(chunks, encode), prefetch_depth)
+    with batch as open_batch:
+        return upload(open_batch, collection_name, encoded_chunks, uuid_for=uuid_for, schema=schema)
@@ -0,0 +1,448 @@
+"""In-process vector index, a drop-in for ``WeaviateVectorStore`` without a server.
+
+Searching Weaviate Cloud costs a WAN round trip per query and needs
+credentials, which tests, benchmarks and edge deployments would rather do
+without. A local index keeps the recipe vectors in a memory-mapped float32
+matrix next to the recipe properties and searches them in process: brute
+force with NumPy, or through an HNSW graph when ``hnswlib`` is installed.
+For a recipe-sized corpus either is well under a millisecond.
+
+:class:`LocalIndexWriter` is a batch for :func:`recipe_search.ingest.ingest`,
+so the createEmbeddings scripts write a local index the same way they
+upload to Weaviate. :class:`LocalVectorStore` answers the calls the query
+scripts make on ``WeaviateVectorStore``: hybrid ``similarity_search`` with
+``alpha``, ``query_properties``, ``filters``, ``return_properties`` and a
+precomputed ``vector``, and ``as_retriever``. Its ``add_texts`` appends
+to the index in place and ``from_texts`` writes a new one.
+
+Each index is a directory ``<index_dir>/<collection>/`` holding
+``vectors.f32`` (unit length rows), ``objects.jsonl`` (one
+``{"uuid", "properties"}`` line per row), ``meta.json`` and, if built,
+``hnsw.bin``.
+"""
+import fnmatch
+import itertools
+import json
+import math
+import os
+import re
+import shutil
+import uuid as uuid_lib
+from collections import Counter, defaultdict
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+from recipe_search.providers import EMBEDDING_MODEL, check_embedding
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+INDEX_DIR = os.path.join(os.path.expanduser("~"), ".cache", "recipe_search", "indexes")
+
+# Weaviate's alpha when a hybrid query doesn't set one
+DEFAULT_ALPHA = 0.75
+# Results taken from each half of a hybrid query before fusing them
+HYBRID_CANDIDATES = 100
+
+# Weaviate's BM25 defaults
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 128
+HNSW_EF = 64
+
+_TOKEN = re.compile(r"\w+")
+
+
+def index_dir():
+    return os.getenv("LOCAL_INDEX_DIR", INDEX_DIR)
+
+
+def index_path(name, directory=None):
+    """Return the directory of the local index for collection ``name``."""
+    return os.path.join(directory or index_dir(), name)
+
+
+def _tokenize(text):
+    return _TOKEN.findall(text.lower())
+
+
+class LocalIndexWriter:
+    """Batch that writes objects to local indexes instead of uploading them.
+
+    Use it in place of :class:`recipe_search.upload.AdaptiveUploader`. Rows
+    are written to a temporary directory per collection, which replaces the
+    previous index only when the batch exits without an error, so readers
+    never see a half-written index.
+    """
+
+    def __init__(self, directory=None, build_hnsw=None, metadata=None):
+        self.directory = directory or index_dir()
+        # Stored in meta.json, e.g. the embedding model from EmbeddingSpec.metadata()
+        self.metadata = metadata or {}
+        # Build the HNSW graph whenever hnswlib is available, unless told otherwise
+        self.build_hnsw = hnswlib is not None if build_hnsw is None else build_hnsw
+        if self.build_hnsw and hnswlib is None:
+            raise ImportError("build_hnsw needs hnswlib: pip install hnswlib")
+        self.open = {}
+        # Nothing is sent anywhere, so nothing can fail; kept for parity with the uploader
+        self.failed = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            for name in list(self.open):
+                self._finish(name)
+        else:
+            for name, (path, vectors, objects, _) in self.open.items():
+                vectors.close()
+                objects.close()
+                shutil.rmtree(path, ignore_errors=True)
+        self.open = {}
+        return False
+
+    def add_object(self, collection, properties=None, uuid=None, vector=None):
+        if vector is None:
+            raise ValueError("Local indexes need client side vectors; the server side vectorizer is not available")
+        if collection not in self.open:
+            path = index_path(collection, self.directory) + ".tmp"
+            shutil.rmtree(path, ignore_errors=True)
+            os.makedirs(path)
+            self.open[collection] = (
+                path,
+                open(os.path.join(path, "vectors.f32"), "wb"),
+                open(os.path.join(path, "objects.jsonl"), "w"),
+                {"count": 0, "dim": None},
+            )
+        path, vectors, objects, meta = self.open[collection]
+
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        if meta["dim"] is None:
+            meta["dim"] = len(vector)
+        elif len(vector) != meta["dim"]:
+            raise ValueError(f"Vector has {len(vector)} dimensions, {collection} has {meta['dim']}")
+        norm = np.linalg.norm(vector)
+        vectors.write((vector / norm if norm else vector).tobytes())
+        record = {"uuid": str(uuid or uuid_lib.uuid4()), "properties": properties or {}}
+        objects.write(json.dumps(record, default=str) + "\n")
+        meta["count"] += 1
+
+    def _finish(self, name):
+        path, vectors, objects, meta = self.open.pop(name)
+        vectors.close()
+        objects.close()
+        meta.update(self.metadata)
+        meta["metric"] = "cosine"
+        meta["hnsw"] = False
+        if self.build_hnsw and meta["count"]:
+            matrix = np.memmap(os.path.join(path, "vectors.f32"), dtype=np.float32, mode="r", shape=(meta["count"], meta["dim"]))
+            graph = hnswlib.Index(space="ip", dim=meta["dim"])
+            graph.init_index(max_elements=meta["count"], ef_construction=HNSW_EF_CONSTRUCTION, M=HNSW_M)
+            graph.add_items(matrix, np.arange(meta["count"]))
+            graph.save_index(os.path.join(path, "hnsw.bin"))
+            meta["hnsw"] = True
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump(meta, f)
+
+        final = index_path(name, self.directory)
+        old = final + ".old"
+        shutil.rmtree(old, ignore_errors=True)
+        if os.path.exists(final):
+            os.replace(final, old)
+        os.replace(path, final)
+        shutil.rmtree(old, ignore_errors=True)
+        print(f"Wrote {meta['count']} recipes to the local index {final}.")
+
+
+class _KeywordIndex:
+    """BM25 over the concatenated text of some properties."""
+
+    def __init__(self, objects, properties):
+        self.postings = defaultdict(list)
+        self.lengths = np.zeros(len(objects), dtype=np.float32)
+        for row, obj in enumerate(objects):
+            values = obj["properties"]
+            names = properties or [name for name, value in values.items() if isinstance(value, str)]
+            tokens = _tokenize(" ".join(str(values.get(name, "")) for name in names))
+            self.lengths[row] = len(tokens)
+            for term, count in Counter(tokens).items():
+                self.postings[term].append((row, count))
+        self.average_length = float(self.lengths.mean()) if len(objects) else 0.0
+
+    def scores(self, query):
+        """Return ``{row: score}`` for the rows that contain a query term."""
+        total = len(self.lengths)
+        scores = defaultdict(float)
+        for term in set(_tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for row, count in postings:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[row] / self.average_length)
+                scores[row] += idf * count * (BM25_K1 + 1) / (count + norm)
+        return scores
+
+
+def _compare(operator, actual, expected):
+    if operator == "Equal":
+        return actual == expected
+    if operator == "NotEqual":
+        return actual != expected
+    if actual is None:
+        return operator == "IsNull" and expected
+    if operator == "IsNull":
+        return not expected
+    if operator == "LessThan":
+        return actual < expected
+    if operator == "LessThanEqual":
+        return actual <= expected
+    if operator == "GreaterThan":
+        return actual > expected
+    if operator == "GreaterThanEqual":
+        return actual >= expected
+    if operator == "Like":
+        return fnmatch.fnmatchcase(str(actual).lower(), str(expected).lower())
+    if operator in ("ContainsAny", "ContainsAll"):
+        actual = actual if isinstance(actual, (list, tuple)) else [actual]
+        check = any if operator == "ContainsAny" else all
+        return check(value in actual for value in expected)
+    raise ValueError(f"Filter operator {operator} is not supported by the local index")
+
+
+def matches(filters, obj):
+    """Evaluate a Weaviate ``Filter`` against a stored object."""
+    operator = filters.operator.value
+    if operator == "And":
+        return all(matches(f, obj) for f in filters.filters)
+    if operator == "Or":
+        return any(matches(f, obj) for f in filters.filters)
+    if not isinstance(filters.target, str):
+        raise ValueError("Reference and count filters are not supported by the local index")
+    actual = obj["uuid"] if filters.target == "_id" else obj["properties"].get(filters.target)
+    return _compare(operator, actual, filters.value)
+
+
+def _normalized(scores):
+    """Scale scores to [0, 1] like Weaviate's relative score fusion."""
+    if not scores:
+        return {}
+    low, high = min(scores.values()), max(scores.values())
+    if high == low:
+        return {row: 1.0 for row in scores}
+    return {row: (score - low) / (high - low) for row, score in scores.items()}
+
+
+class LocalVectorStore(VectorStore):
+    """Vector store over a local index written by :class:`LocalIndexWriter`.
+
+    Only the first ``meta.json`` ``count`` rows are read, and
+    :meth:`add_texts` rewrites ``meta.json`` after appending the rows, so
+    other readers never see a partly appended text.
+    """
+
+    def __init__(self, path, embedding, text_key="title", use_hnsw=None):
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.path = path
+        self.text_key = text_key
+        self._embedding = embedding
+        count, dim = self.meta["count"], self.meta["dim"] or 0
+        self.vectors = (
+            np.memmap(os.path.join(path, "vectors.f32"), dtype=np.float32, mode="r", shape=(count, dim))
+            if count else np.zeros((0, dim), dtype=np.float32)
+        )
+        with open(os.path.join(path, "objects.jsonl")) as f:
+            self.objects = [json.loads(line) for line in itertools.islice(f, count)]
+
+        if use_hnsw is None:
+            use_hnsw = self.meta.get("hnsw", False) and hnswlib is not None
+        self.hnsw = None
+        if use_hnsw:
+            if hnswlib is None:
+                raise ImportError("use_hnsw needs hnswlib: pip install hnswlib")
+            self.hnsw = hnswlib.Index(space="ip", dim=dim)
+            self.hnsw.load_index(os.path.join(path, "hnsw.bin"), max_elements=count)
+            self.hnsw.set_ef(HNSW_EF)
+        # query properties -> keyword index, built on first use
+        self.keyword_indexes = {}
+
+    @classmethod
+    def load(cls, name, embedding, directory=None, text_key="title", use_hnsw=None, spec=None):
+        """Open the local index of collection ``name``.
+
+        With an :class:`recipe_search.providers.EmbeddingSpec`, refuse an
+        index built with a different embedding model or dimension.
+        """
+        store = cls(index_path(name, directory), embedding, text_key=text_key, use_hnsw=use_hnsw)
+        if spec is not None:
+            check_embedding(spec, name, store.meta.get("embedding", EMBEDDING_MODEL), store.meta.get("embedding_dim"))
+        return store
+
+    @property
+    def embeddings(self):
+        return self._embedding
+
+    def __len__(self):
+        return len(self.objects)
+
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs):
+        """Embed ``texts`` and append them to the index, with ``metadatas`` as their properties; return their ids."""
+        texts = list(texts)
+        if not texts:
+            return []
+        vectors = np.asarray(self._embedding.embed_documents(texts), dtype=np.float32)
+        if self.meta["dim"] and vectors.shape[1] != self.meta["dim"]:
+            raise ValueError(f"Vectors have {vectors.shape[1]} dimensions, the index has {self.meta['dim']}")
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1, norms)
+        ids = [str(uuid) for uuid in ids] if ids else [str(uuid_lib.uuid4()) for _ in texts]
+        records = [
+            {"uuid": uuid, "properties": {**(metadatas[i] if metadatas else {}), self.text_key: text}}
+            for i, (uuid, text) in enumerate(zip(ids, texts))
+        ]
+
+        count = self.meta["count"]
+        with open(os.path.join(self.path, "vectors.f32"), "r+b" if count else "wb") as f:
+            # Rows past ``count`` are leftovers of an interrupted append
+            f.truncate(count * vectors.shape[1] * 4)
+            f.seek(0, os.SEEK_END)
+            f.write(vectors.tobytes())
+        with open(os.path.join(self.path, "objects.jsonl"), "r+b" if count else "wb") as f:
+            for _ in range(count):
+                f.readline()
+            f.truncate(f.tell())
+            f.writelines((json.dumps(record, default=str) + "\n").encode() for record in records)
+
+        self.objects += records
+        self.meta["count"] = count = len(self.objects)
+        self.meta["dim"] = dim = vectors.shape[1]
+        self.vectors = np.memmap(os.path.join(self.path, "vectors.f32"), dtype=np.float32, mode="r", shape=(count, dim))
+        if self.hnsw is not None:
+            self.hnsw.resize_index(count)
+            self.hnsw.add_items(vectors, np.arange(count - len(vectors), count))
+            self.hnsw.save_index(os.path.join(self.path, "hnsw.bin"))
+        elif self.meta.get("hnsw"):
+            # A graph this process can't update would miss the new rows
+            self.meta["hnsw"] = False
+        with open(os.path.join(self.path, "meta.json.tmp"), "w") as f:
+            json.dump(self.meta, f)
+        os.replace(os.path.join(self.path, "meta.json.tmp"), os.path.join(self.path, "meta.json"))
+        self.keyword_indexes = {}
+        return ids
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, ids=None, index_name=None, directory=None, text_key="title", **kwargs):
+        """Write ``texts`` to a new local index ``index_name`` (a random name by default) and open it."""
+        texts = list(texts)
+        if not texts:
+            raise ValueError("from_texts needs at least one text to create an index")
+        index_name = index_name or f"LangChain_{uuid_lib.uuid4().hex}"
+        vectors = embedding.embed_documents(texts)
+        with LocalIndexWriter(directory) as writer:
+            for i, (text, vector) in enumerate(zip(texts, vectors)):
+                properties = {**(metadatas[i] if metadatas else {}), text_key: text}
+                writer.add_object(index_name, properties=properties, uuid=ids[i] if ids else None, vector=vector)
+        return cls.load(index_name, embedding, directory=directory, text_key=text_key)
+
+    def _vector_scores(self, vector, limit, mask):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector = vector / norm
+        limit = min(limit, len(self.objects))
+        if self.hnsw is not None and mask is None:
+            labels, distances = self.hnsw.knn_query(vector, k=limit)
+            # hnswlib's inner product distance is 1 - dot
+            return {int(row): 1.0 - float(distance) for row, distance in zip(labels[0], distances[0])}
+
+        similarities = self.vectors @ vector
+        if mask is not None:
+            similarities = np.where(mask, similarities, -np.inf)
+            limit = min(limit, int(mask.sum()))
+        if limit == 0:
+            return {}
+        top = np.argpartition(-similarities, limit - 1)[:limit]
+        return {int(row): float(similarities[row]) for row in top}
+
+    def _keyword_scores(self, query, query_properties, limit, mask):
+        names = tuple(name.split("^")[0] for name in query_properties) if query_properties else None
+        if names not in self.keyword_indexes:
+            self.keyword_indexes[names] = _KeywordIndex(self.objects, names)
+        scores = self.keyword_indexes[names].scores(query)
+        if mask is not None:
+            scores = {row: score for row, score in scores.items() if mask[row]}
+        return dict(sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit])
+
+    def similarity_search_with_score(
+        self,
+        query,
+        k=4,
+        vector=None,
+        alpha=DEFAULT_ALPHA,
+        query_properties=None,
+        filters=None,
+        return_properties=None,
+        return_uuids=False,
+        include_vector=False,
+        **kwargs,
+    ):
+        """Hybrid search fusing vector and BM25 scores, as ``WeaviateVectorStore`` does.
+
+        With ``include_vector`` each result carries its stored vector in
+        ``metadata["vector"]``, as in ``WeaviateVectorStore``.
+        """
+        if not self.objects:
+            return []
+        mask = None
+        if filters is not None:
+            mask = np.fromiter((matches(filters, obj) for obj in self.objects), dtype=bool, count=len(self.objects))
+
+        limit = max(k, HYBRID_CANDIDATES)
+        vector_scores = {}
+        if alpha > 0:
+            if vector is None:
+                vector = self._embedding.embed_query(query)
+            vector_scores = self._vector_scores(vector, limit if alpha < 1 else k, mask)
+        keyword_scores = {}
+        if alpha < 1 and query:
+            keyword_scores = self._keyword_scores(query, query_properties, limit, mask)
+
+        if alpha >= 1:
+            fused = vector_scores
+        elif alpha <= 0:
+            fused = keyword_scores
+        else:
+            vector_scores = _normalized(vector_scores)
+            keyword_scores = _normalized(keyword_scores)
+            fused = {
+                row: alpha * vector_scores.get(row, 0.0) + (1 - alpha) * keyword_scores.get(row, 0.0)
+                for row in vector_scores.keys() | keyword_scores.keys()
+            }
+
+        results = []
+        for row, score in sorted(fused.items(), key=lambda item: item[1], reverse=True)[:k]:
+            properties = dict(self.objects[row]["properties"])
+            text = properties.pop(self.text_key, "")
+            if return_properties is not None:
+                properties = {name: value for name, value in properties.items() if name in return_properties}
+            if return_uuids:
+                properties["uuid"] = self.objects[row]["uuid"]
+            if include_vector:
+                properties["vector"] = self.vectors[row].tolist()
+            results.append((Document(page_content=text, metadata=properties), score))
+        return results
+
+    def similarity_search(self, query, k=4, **kwargs):
+        return [document for document, _ in self.similarity_search_with_score(query, k=k, **kwargs)]
+
+    def similarity_search_by_vector(self, embedding, k=4, **kwargs):
+        kwargs.setdefault("alpha", 1.0)
+        return self.similarity_search(None, k=k, vector=embedding, **kwargs)
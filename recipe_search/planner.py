@@ -0,0 +1,122 @@
+"""Query building and result formatting shared by the meal planner front ends."""
+import re
+import time
+
+from weaviate.classes.query import Filter
+
+from recipe_search.telemetry import telemetry
+
+COLLECTIONS = ("RecipeST", "RecipeHFE", "RecipeV4")
+
+# Recipe properties shown for every meal option
+DISPLAY_FIELDS = ("ingredients", "instructions_list", "calories", "carbohydrates_g", "fat_g", "protein_g")
+
+# Properties fetched for every search hit; the other recipe columns stay on the server
+RETURN_PROPERTIES = ("title",) + DISPLAY_FIELDS
+
+# Weight of the vector score in hybrid search: 1 is pure vector search, 0 pure BM25
+HYBRID_ALPHA = 0.5
+
+# Properties the BM25 half of hybrid search matches against, so named
+# ingredients are found even when the embedding misses them
+KEYWORD_PROPERTIES = ("title", "ingredients")
+
+# Thresholds applied for nutrition goals named in the meal planner answers
+NUTRITION_GOALS = {
+    "high-protein": ("protein_g", ">=", 20),
+    "low-carb": ("carbohydrates_g", "<=", 20),
+    "low-fat": ("fat_g", "<=", 10),
+    "low-calorie": ("calories", "<=", 400),
+}
+
+NUTRIENT_FIELDS = {
+    "calories": "calories",
+    "protein": "protein_g",
+    "carb": "carbohydrates_g",
+    "carbs": "carbohydrates_g",
+    "carbohydrate": "carbohydrates_g",
+    "carbohydrates": "carbohydrates_g",
+    "fat": "fat_g",
+}
+
+# Explicit goals such as "protein >= 30" or "calories<500"
+_LIMIT = re.compile(r"\b(calories|protein|carbs?|carbohydrates?|fat)\s*(<=|>=|<|>)\s*(\d+(?:\.\d+)?)", re.IGNORECASE)
+
+
+def meal_query(meal_type, ingredients="", nutrition_goals="", any_other=""):
+    """Build the search query from the meal planner answers."""
+    return f"{meal_type} {ingredients} {nutrition_goals} {any_other}"
+
+
+def recipe_result(document):
+    """Turn a search result into a plain dict with the displayed fields."""
+    return {"title": document.page_content, **{field: document.metadata.get(field) for field in DISPLAY_FIELDS}}
+
+
+def recipe_results(documents):
+    """Turn search results into plain dicts with :func:`recipe_result`."""
+    with telemetry().span("result_format", results=len(documents)):
+        return [recipe_result(document) for document in documents]
+
+
+def hybrid_kwargs(alpha=HYBRID_ALPHA, query_properties=KEYWORD_PROPERTIES):
+    """Return the search arguments for a hybrid BM25 + vector query with weight ``alpha``."""
+    if not 0 <= alpha <= 1:
+        raise ValueError(f"alpha must be between 0 and 1, got {alpha}")
+    return {"alpha": alpha, "query_properties": list(query_properties)}
+
+
+def search_recipes(vectorstore, query, k=4, return_properties=RETURN_PROPERTIES, timings=None, **kwargs):
+    """Run ``similarity_search`` fetching only ``return_properties`` for each hit.
+
+    ``WeaviateVectorStore.similarity_search`` runs a hybrid query, so
+    ``alpha`` and ``query_properties`` (see :func:`hybrid_kwargs`) are
+    passed through. If ``timings`` is a dict, the time spent embedding the
+    query and searching is stored in it as ``embed_ms`` and ``search_ms``.
+    """
+    start = time.perf_counter()
+    if kwargs.get("vector") is None:
+        with telemetry().span("query_embed"):
+            kwargs["vector"] = vectorstore.embeddings.embed_query(query)
+    embedded = time.perf_counter()
+    with telemetry().span("ann_search", k=k):
+        results = vectorstore.similarity_search(query, k=k, return_properties=list(return_properties), **kwargs)
+    if timings is not None:
+        timings["embed_ms"] = round((embedded - start) * 1000, 2)
+        timings["search_ms"] = round((time.perf_counter() - embedded) * 1000, 2)
+    return results
+
+
+def nutrition_conditions(nutrition_goals):
+    """Return ``(field, operator, value)`` conditions for the goals in ``nutrition_goals``.
+
+    Named goals such as "high protein" or "low-carb" use the thresholds in
+    ``NUTRITION_GOALS``; explicit limits such as "calories < 500" are used
+    as written and take precedence for the same field.
+    """
+    text = (nutrition_goals or "").lower()
+    conditions = {}
+    for goal, (field, operator, value) in NUTRITION_GOALS.items():
+        if re.search(r"\b" + goal.replace("-", r"[\s-]?") + r"\b", text):
+            conditions[field, operator] = value
+    for nutrient, operator, value in _LIMIT.findall(text):
+        conditions[NUTRIENT_FIELDS[nutrient.lower()], operator] = float(value)
+    return [(field, operator, value) for (field, operator), value in conditions.items()]
+
+
+def nutrition_filters(conditions):
+    """Combine nutrition conditions into a Weaviate filter, or ``None`` if there are none."""
+    filters = []
+    for field, operator, value in conditions:
+        prop = Filter.by_property(field)
+        if operator == ">=":
+            filters.append(prop.greater_or_equal(value))
+        elif operator == ">":
+            filters.append(prop.greater_than(value))
+        elif operator == "<=":
+            filters.append(prop.less_or_equal(value))
+        else:
+            filters.append(prop.less_than(value))
+    if not filters:
+        return None
+    return Filter.all_of(filters)
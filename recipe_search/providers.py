@@ -0,0 +1,175 @@
+"""Configurable embedding model shared by ingest and query.
+
+``EmbeddingSpec`` names the model, the inference backend and an optional
+output dimension, read from the .env file:
+
+- EMBEDDING_MODEL: any sentence-transformers model, e.g. the smaller
+  ``sentence-transformers/all-MiniLM-L6-v2`` (default
+  ``sentence-transformers/all-mpnet-base-v2``).
+- EMBEDDING_BACKEND: ``torch`` (default), ``onnx`` for ONNX Runtime, or
+  ``onnx-int8`` for a dynamically quantized int8 ONNX export, which is
+  usually the fastest on CPU. EMBEDDING_ONNX_FILE picks the ONNX file
+  inside the model repository.
+- EMBEDDING_DIM: keep only the first N dimensions (Matryoshka-style
+  truncation), re-normalized. This only makes sense for models trained
+  for it.
+
+The backend doesn't change which collection a model can query, but the
+model and the dimension do, so both are recorded on every collection
+when it is created (in its description for Weaviate, in ``meta.json``
+for a local index) and :func:`check_collection` refuses to query a
+collection built with a different model or dimension.
+"""
+import os
+import re
+
+from langchain_core.embeddings import Embeddings
+
+EMBEDDING_MODEL = "sentence-transformers/all-mpnet-base-v2"
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+# Quantized ONNX export that the sentence-transformers model repositories ship
+INT8_ONNX_FILE = "onnx/model_qint8_avx512_vnni.onnx"
+
+COLLECTION_DESCRIPTION = "A collection to store recipes"
+_RECORD = re.compile(r"embedding=(\S+) dim=(\w+)")
+
+
+class SentenceTransformerEmbeddings(Embeddings):
+    """LangChain embeddings over an already loaded ``SentenceTransformer``.
+
+    Computes the same vectors as ``HuggingFaceEmbeddings`` with
+    ``normalize_embeddings=True``, but lets the query embeddings and the
+    ingest encoder share one copy of the model.
+    """
+
+    def __init__(self, model):
+        self.model = model
+
+    def embed_documents(self, texts):
+        # As HuggingFaceEmbeddings does
+        texts = [text.replace("\n", " ") for text in texts]
+        return self.model.encode(texts, normalize_embeddings=True).tolist()
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+class EmbeddingSpec:
+    """Which model embeds the recipes, how it runs and how many dimensions it keeps."""
+
+    def __init__(self, model_name=EMBEDDING_MODEL, backend="torch", dim=None, onnx_file=None):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown embedding backend {backend!r}, expected one of {', '.join(BACKENDS)}")
+        self.model_name = model_name
+        self.backend = backend
+        self.dim = dim
+        self.onnx_file = onnx_file or (INT8_ONNX_FILE if backend == "onnx-int8" else None)
+
+    @classmethod
+    def from_env(cls):
+        dim = os.getenv("EMBEDDING_DIM")
+        return cls(
+            model_name=os.getenv("EMBEDDING_MODEL", EMBEDDING_MODEL),
+            backend=os.getenv("EMBEDDING_BACKEND", "torch"),
+            dim=int(dim) if dim else None,
+            onnx_file=os.getenv("EMBEDDING_ONNX_FILE"),
+        )
+
+    def __repr__(self):
+        return f"EmbeddingSpec({self.model_name!r}, backend={self.backend!r}, dim={self.dim})"
+
+    @property
+    def cache_name(self):
+        """Name for :class:`recipe_search.cache.EmbeddingCache`, unique per model, backend and dimension."""
+        name = self.model_name
+        if self.backend != "torch":
+            name += f"@{self.backend}"
+        if self.dim:
+            name += f"/{self.dim}"
+        return name
+
+    def model_kwargs(self):
+        """Keyword arguments for ``SentenceTransformer(model_name, ...)``."""
+        kwargs = {"device": "cpu"}
+        if self.backend != "torch":
+            kwargs["backend"] = "onnx"
+            if self.onnx_file:
+                kwargs["model_kwargs"] = {"file_name": self.onnx_file}
+        if self.dim:
+            kwargs["truncate_dim"] = self.dim
+        return kwargs
+
+    def sentence_transformer(self):
+        from sentence_transformers import SentenceTransformer
+
+        return SentenceTransformer(self.model_name, **self.model_kwargs())
+
+    def encoder(self, model=None):
+        """Return a ``texts -> vectors`` function; truncated vectors are re-normalized.
+
+        ``model`` is a ``SentenceTransformer`` already loaded from this spec.
+        """
+        model = model or self.sentence_transformer()
+
+        def encode(texts):
+            return model.encode(texts, normalize_embeddings=True)
+
+        return encode
+
+    def embeddings(self, model=None):
+        """Return LangChain embeddings for queries, on ``model`` if one is already loaded."""
+        return SentenceTransformerEmbeddings(model or self.sentence_transformer())
+
+    def description(self, text=COLLECTION_DESCRIPTION):
+        """Collection description that records the model and dimension."""
+        return f"{text} (embedding={self.model_name} dim={self.dim or 'full'})"
+
+    def metadata(self):
+        """Local index metadata that records the model and dimension."""
+        return {"embedding": self.model_name, "embedding_dim": self.dim}
+
+
+def export_int8(model_name, output_dir, config="avx512_vnni"):
+    """Export ``model_name`` to ONNX and save a dynamically quantized int8 copy in ``output_dir``.
+
+    For models whose repository has no quantized export; point
+    EMBEDDING_MODEL at ``output_dir`` and set EMBEDDING_ONNX_FILE to the
+    file this returns.
+    """
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    model = SentenceTransformer(model_name, device="cpu", backend="onnx")
+    model.save_pretrained(output_dir)
+    export_dynamic_quantized_onnx_model(model, config, output_dir)
+    return f"onnx/model_qint8_{config}.onnx"
+
+
+def check_embedding(spec, name, model_name, dim):
+    """Raise ``RuntimeError`` if ``name`` was built with another model or dimension than ``spec``."""
+    if model_name != spec.model_name or dim != spec.dim:
+        raise RuntimeError(
+            f"{name} was built with {model_name} ({dim or 'full'} dimensions) but queries use "
+            f"{spec.model_name} ({spec.dim or 'full'} dimensions); rebuild it or change EMBEDDING_MODEL/EMBEDDING_DIM"
+        )
+
+
+def recorded_embedding(description):
+    """Return the ``(model_name, dim)`` recorded in a collection description by :meth:`EmbeddingSpec.description`."""
+    match = _RECORD.search(description or "")
+    if match is None:
+        # Collections created before models were configurable used the default model
+        return EMBEDDING_MODEL, None
+    model_name, dim = match.groups()
+    return model_name, None if dim == "full" else int(dim)
+
+
+def check_collection(client, name, spec):
+    """Refuse to query the Weaviate collection ``name`` with an incompatible ``spec``."""
+    check_embedding(spec, name, *recorded_embedding(client.collections.get(name).config.get().description))
+
+
+async def acheck_collection(client, name, spec):
+    """Async version of :func:`check_collection` for ``WeaviateAsyncClient``."""
+    config = await client.collections.get(name).config.get()
+    check_embedding(spec, name, *recorded_embedding(config.description))
@@ -0,0 +1,200 @@
+"""Vector index settings for the recipe collections and a recall/latency report.
+
+Full float32 vectors make up most of the HNSW index memory: 768
+dimensions cost 3 KB per recipe. Weaviate can keep compressed vectors in
+memory instead and rescore with the full ones from disk:
+
+- ``pq`` (product quantization) stores one byte per segment,
+- ``bq`` (binary quantization) one bit per dimension,
+- ``sq`` (scalar quantization) one byte per dimension.
+
+:func:`vector_index_config` builds the HNSW config for the createEmbeddings
+scripts from the ``VECTOR_QUANTIZER`` and ``HNSW_*`` settings. Compression
+and a smaller ``ef`` trade recall for memory and latency, so
+:func:`recall_report` measures both against exact search over the stored
+vectors before a setting is rolled out::
+
+    python -m recipe_search.quantization RecipeST_v3 RecipeST_v4 --k 10 --ef 16,32,64,128
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import weaviate.classes.config as wvcc
+
+QUANTIZERS = ("none", "pq", "bq", "sq")
+
+# Weaviate's HNSW defaults, used to estimate memory when a setting is unset
+DEFAULT_MAX_CONNECTIONS = 32
+REPORT_EF = (16, 32, 64, 128, 256)
+REPORT_QUERIES = 100
+
+
+def _env_int(name):
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
+def vector_index_config(
+    quantizer=None,
+    ef=None,
+    ef_construction=None,
+    max_connections=None,
+    pq_segments=None,
+    training_limit=None,
+    rescore_limit=None,
+    distance_metric=wvcc.VectorDistances.COSINE,
+):
+    """Return the HNSW config for a collection; unset values keep Weaviate's defaults."""
+    quantizer = (quantizer or "none").lower()
+    if quantizer not in QUANTIZERS:
+        raise ValueError(f"Unknown quantizer {quantizer!r}, expected one of {', '.join(QUANTIZERS)}")
+
+    if quantizer == "pq":
+        quantizer_config = wvcc.Configure.VectorIndex.Quantizer.pq(segments=pq_segments, training_limit=training_limit)
+    elif quantizer == "bq":
+        quantizer_config = wvcc.Configure.VectorIndex.Quantizer.bq(rescore_limit=rescore_limit)
+    elif quantizer == "sq":
+        quantizer_config = wvcc.Configure.VectorIndex.Quantizer.sq(
+            rescore_limit=rescore_limit, training_limit=training_limit
+        )
+    else:
+        quantizer_config = None
+
+    return wvcc.Configure.VectorIndex.hnsw(
+        distance_metric=distance_metric,
+        ef=ef,
+        ef_construction=ef_construction,
+        max_connections=max_connections,
+        quantizer=quantizer_config,
+    )
+
+
+def vector_index_config_from_env():
+    """Build :func:`vector_index_config` from the ``VECTOR_QUANTIZER`` and ``HNSW_*`` variables."""
+    return vector_index_config(
+        quantizer=os.getenv("VECTOR_QUANTIZER"),
+        ef=_env_int("HNSW_EF"),
+        ef_construction=_env_int("HNSW_EF_CONSTRUCTION"),
+        max_connections=_env_int("HNSW_MAX_CONNECTIONS"),
+        pq_segments=_env_int("PQ_SEGMENTS"),
+        training_limit=_env_int("QUANTIZER_TRAINING_LIMIT"),
+        rescore_limit=_env_int("QUANTIZER_RESCORE_LIMIT"),
+    )
+
+
+def vector_memory_bytes(count, dim, quantizer=None, pq_segments=None, max_connections=None):
+    """Estimate the in-memory size of an HNSW index: cached vectors plus graph links."""
+    quantizer = (quantizer or "none").lower()
+    if quantizer == "pq":
+        # Weaviate's default is one segment per 4 dimensions for most models
+        per_vector = pq_segments or max(1, dim // 4)
+    elif quantizer == "bq":
+        per_vector = (dim + 7) // 8
+    elif quantizer == "sq":
+        per_vector = dim
+    else:
+        per_vector = dim * 4
+    # Layer 0 keeps twice as many links as the upper layers, 8 bytes each
+    links = 2 * (max_connections or DEFAULT_MAX_CONNECTIONS) * 8
+    return count * (per_vector + links)
+
+
+def stored_vectors(collection):
+    """Return the UUIDs and the float32 vector matrix of every object in ``collection``."""
+    uuids, vectors = [], []
+    for obj in collection.iterator(include_vector=True, return_properties=[]):
+        uuids.append(str(obj.uuid))
+        vectors.append(obj.vector["default"])
+    return uuids, np.asarray(vectors, dtype=np.float32)
+
+
+def exact_neighbours(vectors, queries, k):
+    """Exact cosine top ``k`` rows for each query row, excluding the query itself."""
+    normalized = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    similarities = normalized[queries] @ normalized.T
+    similarities[np.arange(len(queries)), queries] = -np.inf
+    return np.argsort(-similarities, axis=1)[:, :k]
+
+
+def _describe(config, count, dim):
+    index = config.vector_index_config
+    quantizer = index.quantizer.__class__.__name__.lstrip("_").replace("Config", "").lower() if index.quantizer else "none"
+    memory = vector_memory_bytes(
+        count, dim, quantizer, getattr(index.quantizer, "segments", None) or None, index.max_connections
+    )
+    return (
+        f"quantizer={quantizer} ef={index.ef} efConstruction={index.ef_construction} "
+        f"maxConnections={index.max_connections} estimated memory={memory / 2**20:.1f} MiB"
+    )
+
+
+def recall_report(client, names, k=10, ef_values=REPORT_EF, queries=REPORT_QUERIES, seed=0, report=print):
+    """Measure recall@k and query latency of each collection at several ``ef`` values.
+
+    Query vectors are stored vectors sampled from each collection, and the
+    ground truth is exact cosine search over all stored vectors. ``ef`` is
+    changed on the collection while it is measured and restored afterwards,
+    so run this on a collection version that is not serving traffic.
+    Returns one dict per collection and ``ef``.
+    """
+    rng = np.random.default_rng(seed)
+    rows = []
+    for name in names:
+        collection = client.collections.get(name)
+        config = collection.config.get()
+        uuids, vectors = stored_vectors(collection)
+        if len(uuids) <= k:
+            raise ValueError(f"{name} has {len(uuids)} objects, need more than k={k}")
+        sample = rng.choice(len(uuids), size=min(queries, len(uuids)), replace=False)
+        truth = exact_neighbours(vectors, sample, k)
+        report(f"{name}: {len(uuids)} objects, {_describe(config, len(uuids), vectors.shape[1])}")
+
+        original_ef = config.vector_index_config.ef
+        try:
+            for ef in ef_values:
+                collection.config.update(vector_index_config=wvcc.Reconfigure.VectorIndex.hnsw(ef=ef))
+                latencies, hits = [], 0
+                for query, expected in zip(sample, truth):
+                    start = time.perf_counter()
+                    # One extra result because the query vector finds its own object
+                    result = collection.query.near_vector(near_vector=vectors[query].tolist(), limit=k + 1)
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    found = {str(obj.uuid) for obj in result.objects} - {uuids[query]}
+                    hits += len(found & {uuids[row] for row in expected})
+                row = {
+                    "collection": name,
+                    "ef": ef,
+                    f"recall@{k}": round(hits / (len(sample) * k), 4),
+                    "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+                    "p95_ms": round(float(np.percentile(latencies, 95)), 2),
+                }
+                rows.append(row)
+                report("  " + "  ".join(f"{key}={value}" for key, value in row.items() if key != "collection"))
+        finally:
+            collection.config.update(vector_index_config=wvcc.Reconfigure.VectorIndex.hnsw(ef=original_ef))
+    return rows
+
+
+def main(argv=None):
+    from recipe_search.bootstrap import bootstrap
+
+    parser = argparse.ArgumentParser(description="Recall and latency of recipe collections at several ef values.")
+    parser.add_argument("collections", nargs="+", help="collections to measure, e.g. RecipeST_v3 RecipeST_v4")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--ef", default=",".join(map(str, REPORT_EF)), help="comma separated ef values")
+    parser.add_argument("--queries", type=int, default=REPORT_QUERIES)
+    args = parser.parse_args(argv)
+
+    boot = bootstrap()
+    try:
+        recall_report(
+            boot.client(), args.collections, k=args.k, ef_values=[int(ef) for ef in args.ef.split(",")], queries=args.queries
+        )
+    finally:
+        boot.close()
+
+
+if __name__ == "__main__":
+    main()
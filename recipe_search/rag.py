@@ -0,0 +1,252 @@
+"""RAG chain over the recipe collections, in sync and async flavours.
+
+``build_rag_chain`` is the chain used by ``Vectoriser/ragPipeline.py``.
+``AsyncWeaviateRetriever`` searches through the async Weaviate client, so
+the same chain can answer many questions concurrently with ``ainvoke`` or
+``abatch`` without a thread per request.
+
+``stream_answer`` and ``astream_answer`` yield the answer token by token as
+the LLM produces it, so users see the first words after the time to first
+token instead of after the whole answer has been generated.
+
+``LatencyReport`` is a callback handler that reports how long retrieval,
+the time to first token and the whole LLM call took for each question;
+``StageTelemetry`` records the same timings through
+:mod:`recipe_search.telemetry`, and ``build_rag_chain`` attaches it when
+an exporter is configured.
+"""
+import asyncio
+import json
+import time
+from typing import Any, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.documents import Document
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.runnables import RunnableLambda, RunnablePassthrough
+
+from recipe_search.context import ContextBuilder
+from recipe_search.planner import HYBRID_ALPHA, KEYWORD_PROPERTIES, RETURN_PROPERTIES
+from recipe_search.telemetry import telemetry
+
+# Construct a template for the RAG mode
+TEMPLATE = """You are an assistant for question-answering tasks. Use the following pieces of retrieved context to answer the question. If you don't know the answer, just say that you don't know. Show in a detailed information list format for the user to prepare the dishes and analyze the nutrition information of the dishes.
+Question: {question}
+Context: {context}
+Answer:
+"""
+
+CONCURRENCY = 16
+
+
+def build_rag_chain(retriever, llm, prompt=None, context_builder=None):
+    """Build the retriever -> context -> prompt -> LLM -> string chain.
+
+    ``context_builder`` compacts the retrieved recipes to a token budget; a
+    default :class:`recipe_search.context.ContextBuilder` is used if none is
+    given.
+    """
+    prompt = prompt or ChatPromptTemplate.from_template(TEMPLATE)
+    context_builder = context_builder or ContextBuilder()
+
+    def build_context(documents):
+        with telemetry().span("prompt_build", documents=len(documents)):
+            return context_builder.build(documents)
+
+    chain = (
+        {"context": retriever | RunnableLambda(build_context), "question": RunnablePassthrough()}
+        | prompt
+        | RunnableLambda(context_builder.measure_prompt)
+        | llm
+        | StrOutputParser()
+    )
+    if telemetry().enabled:
+        # Merged with the callbacks passed at invoke time, such as LatencyReport
+        chain = chain.with_config(callbacks=[StageTelemetry()])
+    return chain
+
+
+class LatencyReport(BaseCallbackHandler):
+    """Reports per-stage latency of a RAG chain run, in milliseconds.
+
+    Pass it in the run config, e.g. ``chain.invoke(question,
+    config={"callbacks": [LatencyReport(print)]})``. ``report`` is called
+    with ``retrieve_ms`` once retrieval finishes and with
+    ``first_token_ms`` and ``llm_ms`` once the LLM finishes.
+    """
+
+    def __init__(self, report=print):
+        self.report = report
+        self.started = {}
+        self.first_token = {}
+
+    def on_retriever_start(self, serialized, query, *, run_id, **kwargs):
+        self.started[run_id] = time.perf_counter()
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs):
+        start = self.started.pop(run_id, None)
+        if start is not None:
+            self.report({"retrieve_ms": round((time.perf_counter() - start) * 1000, 2), "retrieved": len(documents)})
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self.started[run_id] = time.perf_counter()
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self.started[run_id] = time.perf_counter()
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        self.first_token.setdefault(run_id, time.perf_counter())
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        start = self.started.pop(run_id, None)
+        first_token = self.first_token.pop(run_id, None)
+        if start is None:
+            return
+        timings = {"llm_ms": round((time.perf_counter() - start) * 1000, 2)}
+        if first_token is not None:
+            timings["first_token_ms"] = round((first_token - start) * 1000, 2)
+        self.report(timings)
+
+
+class StageTelemetry(LatencyReport):
+    """Records the :class:`LatencyReport` timings as the ``retrieve``, ``llm_first_token`` and ``llm_call`` stages."""
+
+    STAGES = {"retrieve_ms": "retrieve", "first_token_ms": "llm_first_token", "llm_ms": "llm_call"}
+
+    def __init__(self):
+        super().__init__(self.record)
+
+    def record(self, timings):
+        for key, stage in self.STAGES.items():
+            if key in timings:
+                telemetry().record(stage, timings[key] / 1000)
+
+
+class AsyncWeaviateRetriever(BaseRetriever):
+    """Retriever backed by ``WeaviateAsyncClient``.
+
+    Returns the same documents as ``WeaviateVectorStore.as_retriever()``: a
+    hybrid query with the title as page content and the other properties
+    in ``return_properties`` as metadata. ``alpha`` weights the vector
+    score against BM25 over ``query_properties``.
+    """
+
+    client: Any
+    index_name: str
+    embeddings: Any
+    text_key: str = "title"
+    k: int = 4
+    return_properties: List[str] = list(RETURN_PROPERTIES)
+    alpha: float = HYBRID_ALPHA
+    query_properties: Optional[List[str]] = list(KEYWORD_PROPERTIES)
+
+    def _get_relevant_documents(self, query, *, run_manager) -> List[Document]:
+        # The async client's connections belong to the loop it was connected in, so a new loop can't drive it
+        raise RuntimeError("AsyncWeaviateRetriever only searches from its event loop; use ainvoke or abatch")
+
+    async def _aget_relevant_documents(self, query, *, run_manager) -> List[Document]:
+        with telemetry().span("query_embed"):
+            vector = await self.embeddings.aembed_query(query)
+        collection = self.client.collections.get(self.index_name)
+        with telemetry().span("ann_search", k=self.k):
+            result = await collection.query.hybrid(
+                query=query,
+                vector=vector,
+                alpha=self.alpha,
+                query_properties=self.query_properties,
+                limit=self.k,
+                return_properties=self.return_properties,
+            )
+        documents = []
+        with telemetry().span("result_format", results=len(result.objects)):
+            for obj in result.objects:
+                properties = dict(obj.properties)
+                documents.append(Document(page_content=properties.pop(self.text_key), metadata=properties))
+        return documents
+
+
+async def answer_questions(chain, questions, concurrency=CONCURRENCY):
+    """Answer ``questions`` with at most ``concurrency`` in flight.
+
+    Yields ``(index, question, answer)`` as answers complete, so results can
+    be written out before the whole batch is done. A failed question yields
+    its exception as the answer.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def answer(index, question):
+        async with semaphore:
+            try:
+                return index, question, await chain.ainvoke(question)
+            except Exception as e:
+                return index, question, e
+
+    tasks = [asyncio.create_task(answer(index, question)) for index, question in enumerate(questions)]
+    for task in asyncio.as_completed(tasks):
+        yield await task
+
+
+async def answer_file(chain, questions_path, output_path, concurrency=CONCURRENCY):
+    """Answer every non-empty line of ``questions_path`` into a JSON Lines file."""
+    with open(questions_path) as f:
+        questions = [line.strip() for line in f if line.strip()]
+
+    failed = 0
+    with open(output_path, "w") as out:
+        async for index, question, answer in answer_questions(chain, questions, concurrency):
+            record = {"index": index, "question": question}
+            if isinstance(answer, Exception):
+                record["error"] = repr(answer)
+                failed += 1
+            else:
+                record["answer"] = answer
+            out.write(json.dumps(record) + "\n")
+    print(f"Answered {len(questions) - failed} of {len(questions)} questions into {output_path}.")
+
+
+def stream_answer(chain, question, cache=None, embed=None, namespace="rag", config=None):
+    """Yield the answer to ``question`` in chunks as the LLM generates it.
+
+    With a :class:`recipe_search.result_cache.ResultCache` a cached answer
+    is yielded in one piece, and a freshly streamed answer is cached once it
+    is complete. ``config`` is passed to ``chain.stream``, e.g. to add a
+    :class:`LatencyReport` callback.
+    """
+    vector = None
+    if cache is not None:
+        cached = cache.get_exact(question, namespace)
+        if cached is None and embed is not None:
+            vector = embed(question)
+            cached = cache.get_similar(vector, namespace)
+        if cached is not None:
+            yield cached
+            return
+
+    chunks = []
+    for chunk in chain.stream(question, config=config):
+        chunks.append(chunk)
+        yield chunk
+    if cache is not None:
+        cache.put(question, "".join(chunks), vector, namespace)
+
+
+async def astream_answer(chain, question, cache=None, aembed=None, namespace="rag", config=None):
+    """Async version of :func:`stream_answer`; ``aembed`` is an async embedding function."""
+    vector = None
+    if cache is not None:
+        cached = cache.get_exact(question, namespace)
+        if cached is None and aembed is not None:
+            vector = await aembed(question)
+            cached = cache.get_similar(vector, namespace)
+        if cached is not None:
+            yield cached
+            return
+
+    chunks = []
+    async for chunk in chain.astream(question, config=config):
+        chunks.append(chunk)
+        yield chunk
+    if cache is not None:
+        cache.put(question, "".join(chunks), vector, namespace)
@@ -0,0 +1,124 @@
+"""Zero-downtime rebuilds through versioned collections and an alias.
+
+A blue/green rebuild ingests into a new versioned collection such as
+``RecipeST_v17`` while readers keep using the live one. Once the new
+version is warm and validated, the alias ``RecipeST`` is repointed to it
+in a single object write, and older versions are dropped.
+
+The alias is stored as an object in the ``RecipeAlias`` collection, so it
+works with any Weaviate server and client version. Readers call
+:func:`resolve_collection` to get the collection behind an alias; names
+without an alias resolve to themselves, so unversioned collections keep
+working.
+"""
+import re
+
+import weaviate.classes.config as wvcc
+from weaviate.util import generate_uuid5
+
+ALIAS_COLLECTION = "RecipeAlias"
+
+# Versions kept after a swap, including the live one, so a rollback is a swap
+KEEP_VERSIONS = 2
+
+
+def _alias_uuid(name):
+    return generate_uuid5(name, ALIAS_COLLECTION)
+
+
+def resolve_collection(client, name):
+    """Return the collection the alias ``name`` points to, or ``name`` itself."""
+    if not client.collections.exists(ALIAS_COLLECTION):
+        return name
+    alias = client.collections.get(ALIAS_COLLECTION).query.fetch_object_by_id(_alias_uuid(name))
+    if alias is None:
+        return name
+    return alias.properties["target"]
+
+
+async def aresolve_collection(client, name):
+    """Async version of :func:`resolve_collection` for ``WeaviateAsyncClient``."""
+    if not await client.collections.exists(ALIAS_COLLECTION):
+        return name
+    alias = await client.collections.get(ALIAS_COLLECTION).query.fetch_object_by_id(_alias_uuid(name))
+    if alias is None:
+        return name
+    return alias.properties["target"]
+
+
+def list_versions(client, name):
+    """Return the version numbers of ``name``, oldest first."""
+    pattern = re.compile(rf"^{re.escape(name)}_v(\d+)$")
+    versions = []
+    for collection_name in client.collections.list_all(simple=True):
+        match = pattern.match(collection_name)
+        if match:
+            versions.append(int(match.group(1)))
+    return sorted(versions)
+
+
+def next_version_name(client, name):
+    """Return the name of the next versioned collection for ``name``."""
+    versions = list_versions(client, name)
+    return f"{name}_v{versions[-1] + 1 if versions else 1}"
+
+
+def validate_collection(client, target, expected_count, probe_vector=None, probe_text=None):
+    """Check the object count and warm the vector index with a probe query.
+
+    Raises ``RuntimeError`` if the collection is not ready to serve.
+    """
+    collection = client.collections.get(target)
+    total = collection.aggregate.over_all(total_count=True).total_count
+    if total != expected_count:
+        raise RuntimeError(f"{target} has {total} objects, expected {expected_count}")
+
+    if probe_vector is not None:
+        results = collection.query.near_vector(near_vector=list(probe_vector), limit=10)
+    elif probe_text is not None:
+        results = collection.query.near_text(query=probe_text, limit=10)
+    else:
+        results = collection.query.fetch_objects(limit=10)
+    if expected_count and not results.objects:
+        raise RuntimeError(f"{target} returned no results for the probe query")
+
+
+def swap_alias(client, name, target):
+    """Point the alias ``name`` at ``target`` and return the previous target."""
+    if not client.collections.exists(ALIAS_COLLECTION):
+        client.collections.create(
+            name=ALIAS_COLLECTION,
+            description="Maps recipe collection aliases to their live versions",
+            vectorizer_config=wvcc.Configure.Vectorizer.none(),
+            properties=[
+                wvcc.Property(name="alias", data_type=wvcc.DataType.TEXT),
+                wvcc.Property(name="target", data_type=wvcc.DataType.TEXT),
+            ],
+        )
+    aliases = client.collections.get(ALIAS_COLLECTION)
+    uuid = _alias_uuid(name)
+    previous = resolve_collection(client, name)
+    properties = {"alias": name, "target": target}
+    if aliases.data.exists(uuid):
+        aliases.data.replace(uuid=uuid, properties=properties)
+    else:
+        aliases.data.insert(uuid=uuid, properties=properties)
+    return previous
+
+
+def drop_old_versions(client, name, keep=KEEP_VERSIONS):
+    """Delete all but the newest ``keep`` versions of ``name``, never the live one."""
+    live = resolve_collection(client, name)
+    versions = list_versions(client, name)
+    for version in versions[:-keep] if keep else versions:
+        version_name = f"{name}_v{version}"
+        if version_name != live:
+            client.collections.delete(version_name)
+
+
+def promote(client, name, target, expected_count, probe_vector=None, probe_text=None, keep=KEEP_VERSIONS):
+    """Validate ``target``, point the alias ``name`` at it and drop old versions."""
+    validate_collection(client, target, expected_count, probe_vector=probe_vector, probe_text=probe_text)
+    previous = swap_alias(client, name, target)
+    print(f"Alias {name} now points to {target} (was {previous}).")
+    drop_old_versions(client, name, keep=keep)
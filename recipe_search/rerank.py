@@ -0,0 +1,210 @@
+"""Diversity-aware reranking of meal planner results.
+
+The raw top-k of a hybrid search is often several versions of the same
+dish. :func:`diverse_search` fetches ``fetch_k`` candidates once, with
+their stored vectors, and picks ``k`` of them with maximal marginal
+relevance (MMR): each pick maximises ``lambda_mult * relevance - (1 -
+lambda_mult) * similarity to the recipes already picked``. The
+similarities come from the candidate vectors, so no extra search or
+embedding is needed, and the whole selection is a few NumPy operations
+on a ``fetch_k x fetch_k`` matrix.
+
+Relevance is the cosine similarity of the candidate to the query, or
+with a :class:`CrossEncoderReranker` the score of a small cross-encoder
+that reads the query and the recipe together, which ranks better than
+the embedding at the cost of one batched forward pass over the
+candidates on CPU.
+
+:meth:`Reranker.from_env` reads RERANK, ``mmr`` (default),
+``cross-encoder`` or ``none``, and RERANK_FETCH_K (default 20),
+MMR_LAMBDA (default 0.7) and CROSS_ENCODER_MODEL.
+"""
+import os
+import threading
+import time
+
+import numpy as np
+
+from recipe_search.planner import search_recipes
+from recipe_search.telemetry import telemetry
+
+RERANKERS = ("none", "mmr", "cross-encoder")
+FETCH_K = 20
+# Closer to relevance than LangChain's 0.5: near-duplicates are dropped but
+# the best match still comes first
+MMR_LAMBDA = 0.7
+CROSS_ENCODER_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+CROSS_ENCODER_BATCH_SIZE = 32
+# Recipe fields the cross-encoder reads next to the query
+CROSS_ENCODER_FIELDS = ("ingredients",)
+
+
+def mmr(query_vector, vectors, k, lambda_mult=MMR_LAMBDA, relevance=None):
+    """Return the indices of ``k`` rows of ``vectors`` chosen by maximal marginal relevance, best first.
+
+    ``relevance`` replaces the cosine similarity of each row to
+    ``query_vector``, e.g. with cross-encoder scores.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if len(vectors) == 0 or k <= 0:
+        return []
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.where(norms == 0, 1, norms)
+    if relevance is None:
+        query_vector = np.asarray(query_vector, dtype=np.float32)
+        relevance = vectors @ (query_vector / (np.linalg.norm(query_vector) or 1))
+    relevance = np.asarray(relevance, dtype=np.float32)
+    similarity = vectors @ vectors.T
+
+    selected = [int(np.argmax(relevance))]
+    # Highest similarity of every candidate to the picked ones
+    redundancy = similarity[selected[0]].copy()
+    available = np.ones(len(vectors), dtype=bool)
+    available[selected[0]] = False
+    while len(selected) < min(k, len(vectors)):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        scores[~available] = -np.inf
+        pick = int(np.argmax(scores))
+        selected.append(pick)
+        available[pick] = False
+        np.maximum(redundancy, similarity[pick], out=redundancy)
+    return selected
+
+
+class CrossEncoderReranker:
+    """Scores ``(query, recipe)`` pairs with a sentence-transformers cross-encoder on CPU.
+
+    The model is loaded on first use, or by :meth:`load`; candidates are
+    scored in batches of ``batch_size``. One instance can be shared by
+    rerankers on several threads.
+    """
+
+    def __init__(self, model_name=CROSS_ENCODER_MODEL, batch_size=CROSS_ENCODER_BATCH_SIZE, fields=CROSS_ENCODER_FIELDS):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.fields = fields
+        self.model = None
+        self.lock = threading.Lock()
+
+    def load(self):
+        with self.lock:
+            if self.model is None:
+                from sentence_transformers import CrossEncoder
+
+                self.model = CrossEncoder(self.model_name, device="cpu")
+        return self.model
+
+    def text(self, document):
+        parts = [document.page_content]
+        parts += [str(document.metadata[field]) for field in self.fields if document.metadata.get(field)]
+        return "\n".join(parts)
+
+    def scores(self, query, documents):
+        """Return one relevance score per document, scaled to [0, 1] over the candidates."""
+        scores = np.asarray(
+            self.load().predict([(query, self.text(document)) for document in documents], batch_size=self.batch_size),
+            dtype=np.float32,
+        )
+        # Comparable with the cosine redundancy term whatever the model's output range
+        spread = scores.max() - scores.min() if len(scores) else 0
+        return (scores - scores.min()) / spread if spread else np.ones_like(scores)
+
+
+def rerank(query, query_vector, documents, k, lambda_mult=MMR_LAMBDA, cross_encoder=None):
+    """Pick ``k`` of ``documents`` by MMR over their ``metadata["vector"]``, which is removed.
+
+    Documents without a stored vector are returned in their original
+    order.
+    """
+    vectors = [document.metadata.pop("vector", None) for document in documents]
+    if any(vector is None for vector in vectors):
+        return documents[:k]
+    relevance = cross_encoder.scores(query, documents) if cross_encoder is not None else None
+    return [documents[i] for i in mmr(query_vector, vectors, k, lambda_mult, relevance)]
+
+
+def diverse_search(
+    vectorstore,
+    query,
+    k=4,
+    fetch_k=FETCH_K,
+    lambda_mult=MMR_LAMBDA,
+    cross_encoder=None,
+    timings=None,
+    **kwargs,
+):
+    """Search for ``fetch_k`` candidates with :func:`recipe_search.planner.search_recipes` and rerank them to ``k``.
+
+    ``kwargs`` (``filters``, ``alpha``, ``vector``, ...) go to the search.
+    The reranking time is stored in ``timings`` as ``rerank_ms``.
+    """
+    start = time.perf_counter()
+    if kwargs.get("vector") is None:
+        # Embedded here because MMR needs the query vector too
+        with telemetry().span("query_embed"):
+            kwargs["vector"] = vectorstore.embeddings.embed_query(query)
+    embed_ms = round((time.perf_counter() - start) * 1000, 2)
+    candidates = search_recipes(vectorstore, query, k=max(k, fetch_k), timings=timings, include_vector=True, **kwargs)
+    if timings is not None:
+        timings["embed_ms"] = embed_ms
+    start = time.perf_counter()
+    with telemetry().span("rerank", candidates=len(candidates)):
+        results = rerank(query, kwargs["vector"], candidates, k, lambda_mult, cross_encoder)
+    if timings is not None:
+        timings["rerank_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    return results
+
+
+class Reranker:
+    """How meal planner searches are reranked.
+
+    ``method`` is ``mmr``, ``cross-encoder`` (MMR with cross-encoder
+    relevance) or ``none`` (the raw top-k). Rerankers are cheap to build
+    per request as long as they share their :class:`CrossEncoderReranker`
+    through ``cross_encoders``, a ``{model name: CrossEncoderReranker}``
+    dict that is filled as models are needed.
+    """
+
+    def __init__(
+        self, method="mmr", fetch_k=FETCH_K, lambda_mult=MMR_LAMBDA, cross_encoder_model=CROSS_ENCODER_MODEL, cross_encoders=None
+    ):
+        if method not in RERANKERS:
+            raise ValueError(f"Unknown reranker {method!r}, expected one of {', '.join(RERANKERS)}")
+        self.method = method
+        self.fetch_k = fetch_k
+        self.lambda_mult = lambda_mult
+        self.cross_encoder = None
+        if method == "cross-encoder":
+            cross_encoders = {} if cross_encoders is None else cross_encoders
+            if cross_encoder_model not in cross_encoders:
+                cross_encoders[cross_encoder_model] = CrossEncoderReranker(cross_encoder_model)
+            self.cross_encoder = cross_encoders[cross_encoder_model]
+
+    @classmethod
+    def from_env(cls, method=None, fetch_k=None, lambda_mult=None, cross_encoders=None):
+        """Build from RERANK, RERANK_FETCH_K, MMR_LAMBDA and CROSS_ENCODER_MODEL; arguments that are set win."""
+        return cls(
+            method=method or os.getenv("RERANK", "mmr"),
+            fetch_k=fetch_k or int(os.getenv("RERANK_FETCH_K", FETCH_K)),
+            lambda_mult=float(os.getenv("MMR_LAMBDA", MMR_LAMBDA)) if lambda_mult is None else lambda_mult,
+            cross_encoder_model=os.getenv("CROSS_ENCODER_MODEL", CROSS_ENCODER_MODEL),
+            cross_encoders=cross_encoders,
+        )
+
+    def __repr__(self):
+        return f"Reranker({self.method!r}, fetch_k={self.fetch_k}, lambda_mult={self.lambda_mult})"
+
+    def search(self, vectorstore, query, k=4, timings=None, **kwargs):
+        """Return the top ``k`` recipes for ``query``, reranked with this method."""
+        if self.method == "none":
+            return search_recipes(vectorstore, query, k=k, timings=timings, **kwargs)
+        return diverse_search(
+            vectorstore,
+            query,
+            k=k,
+            fetch_k=self.fetch_k,
+            lambda_mult=self.lambda_mult,
+            cross_encoder=self.cross_encoder,
+            timings=timings,
+            **kwargs,
+        )
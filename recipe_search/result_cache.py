@@ -0,0 +1,174 @@
+"""Exact and semantic cache for search results and RAG answers.
+
+Traffic is dominated by a small set of repeated questions, so results are
+cached at two levels:
+
+* exact: the normalised query text (lower case, punctuation and extra
+  whitespace removed) is looked up directly, without embedding anything;
+* semantic: otherwise the query embedding is compared with the embeddings
+  of the cached queries, and a cached value is reused when the cosine
+  similarity is at least ``threshold``.
+
+Entries expire after ``ttl`` seconds and the least recently used entry is
+evicted once ``max_entries`` is reached. A hit skips both the vector
+search and the LLM call.
+
+Embeddings are only compared with cached embeddings of the same
+dimension, and callers that persist the cache put the embedding model in
+the namespace, so answers saved under another EMBEDDING_MODEL or
+EMBEDDING_DIM are never matched.
+"""
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+MAX_ENTRIES = 1024
+TTL = 3600.0
+THRESHOLD = 0.95
+
+
+def normalize_query(text):
+    """Normalise a query so that trivially different spellings share a cache entry."""
+    return " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split())
+
+
+class ResultCache:
+    """Size and time bounded cache keyed by query text and query embedding.
+
+    ``namespace`` separates entries that must not be shared, e.g. results
+    for different collections or a different ``k``.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES, ttl=TTL, threshold=THRESHOLD, path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self.path = path
+        # (namespace, normalised text) -> (value, unit vector or None, expiry time)
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self._matrix = None
+        self._matrix_keys = []
+        self._matrix_dim = None
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        if path and os.path.exists(path):
+            self._load()
+
+    def _load(self):
+        with open(self.path) as f:
+            saved = json.load(f)
+        now = time.time()
+        for namespace, text, value, vector, expires in saved:
+            if expires > now:
+                self.entries[(namespace, text)] = (value, None if vector is None else np.asarray(vector, dtype=np.float32), expires)
+
+    def save(self):
+        """Write the live entries to ``path``, if the cache has one."""
+        if not self.path:
+            return
+        with self.lock:
+            self._expire()
+            saved = [
+                [namespace, text, value, None if vector is None else vector.tolist(), expires]
+                for (namespace, text), (value, vector, expires) in self.entries.items()
+            ]
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(saved, f)
+        os.replace(tmp_path, self.path)
+
+    def _expire(self):
+        now = time.time()
+        expired = [key for key, (_, _, expires) in self.entries.items() if expires <= now]
+        for key in expired:
+            del self.entries[key]
+        if expired:
+            self._matrix = None
+
+    def _semantic_index(self, dim):
+        """Matrix of the cached embeddings with ``dim`` dimensions and their keys."""
+        if self._matrix is None or self._matrix_dim != dim:
+            self._matrix_keys = [
+                key for key, (_, vector, _) in self.entries.items() if vector is not None and len(vector) == dim
+            ]
+            vectors = [self.entries[key][1] for key in self._matrix_keys]
+            self._matrix = np.stack(vectors) if vectors else np.empty((0, dim), dtype=np.float32)
+            self._matrix_dim = dim
+        return self._matrix, self._matrix_keys
+
+    def get_exact(self, text, namespace=""):
+        """Return the value cached for exactly this query, or ``None``."""
+        key = (namespace, normalize_query(text))
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[2] <= time.time():
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def get_similar(self, vector, namespace=""):
+        """Return the value cached for the most similar query above the threshold, or ``None``."""
+        query = np.asarray(vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        with self.lock:
+            self._expire()
+            matrix, keys = self._semantic_index(len(query))
+            if not keys:
+                self.misses += 1
+                return None
+            scores = matrix @ query
+            for index in np.argsort(-scores):
+                if scores[index] < self.threshold:
+                    break
+                key = keys[index]
+                if key[0] == namespace:
+                    self.entries.move_to_end(key)
+                    self.semantic_hits += 1
+                    return self.entries[key][0]
+            self.misses += 1
+            return None
+
+    def put(self, text, value, vector=None, namespace=""):
+        """Cache ``value`` for the query ``text`` and, if given, its embedding."""
+        if vector is not None:
+            vector = np.asarray(vector, dtype=np.float32)
+            vector = vector / (np.linalg.norm(vector) or 1.0)
+        with self.lock:
+            key = (namespace, normalize_query(text))
+            self.entries[key] = (value, vector, time.time() + self.ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            self._matrix = None
+
+    def get_or_compute(self, text, compute, embed=None, namespace=""):
+        """Return the cached value for ``text`` or compute and cache it.
+
+        ``embed`` maps the text to its embedding and enables the semantic
+        level; ``compute`` is called with the text and that embedding (or
+        ``None``) on a miss, so the caller can reuse the vector for the
+        search.
+        """
+        value = self.get_exact(text, namespace)
+        if value is not None:
+            return value
+        vector = None
+        if embed is not None:
+            vector = embed(text)
+            value = self.get_similar(vector, namespace)
+            if value is not None:
+                return value
+        else:
+            self.misses += 1
+        value = compute(text, vector)
+        self.put(text, value, vector, namespace)
+        return value
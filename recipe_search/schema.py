@@ -0,0 +1,89 @@
+"""Typed collection schema inferred from the recipe columns.
+
+Nutrition columns (``calories`` and everything measured in g, mg, mcg or
+IU) are stored as NUMBER with filterable and range indexes, and other
+numeric columns keep their INT/NUMBER type. This lets searches filter on
+nutrition inside Weaviate instead of treating "high-protein" as words.
+"""
+import re
+
+import weaviate.classes.config as wvcc
+
+NUTRITION_SUFFIXES = ("_g", "_mg", "_mcg", "_iu")
+NUTRITION_COLUMNS = ("calories",)
+
+# Columns that are never uploaded as properties
+SKIP_COLUMNS = ("embedding", "embeddings")
+
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+# Thousands separators, as in "1,200 kcal"
+_THOUSANDS = re.compile(r"(?<=\d),(?=\d{3}(?!\d))")
+
+
+def is_nutrition_column(name):
+    name = name.lower()
+    return name in NUTRITION_COLUMNS or name.endswith(NUTRITION_SUFFIXES)
+
+
+def infer_schema(recipe):
+    """Return ``{column: DataType}`` for a sample recipe."""
+    schema = {}
+    for name, value in recipe.items():
+        if name in SKIP_COLUMNS:
+            continue
+        if is_nutrition_column(name):
+            schema[name] = wvcc.DataType.NUMBER
+        elif isinstance(value, bool):
+            schema[name] = wvcc.DataType.BOOL
+        elif isinstance(value, int):
+            schema[name] = wvcc.DataType.INT
+        elif isinstance(value, float):
+            schema[name] = wvcc.DataType.NUMBER
+        else:
+            schema[name] = wvcc.DataType.TEXT
+    return schema
+
+
+def collection_properties(schema):
+    """Return the collection properties for a schema, with range indexes on numbers."""
+    properties = []
+    for name, data_type in schema.items():
+        if data_type in (wvcc.DataType.NUMBER, wvcc.DataType.INT):
+            properties.append(wvcc.Property(
+                name=name,
+                data_type=data_type,
+                index_filterable=True,
+                index_range_filters=True,
+            ))
+        else:
+            properties.append(wvcc.Property(name=name, data_type=data_type))
+    return properties
+
+
+def to_number(value):
+    """Parse a number from values like ``12``, ``"12.5"``, ``"12 g"`` or ``"1,200"``; ``None`` if there is none."""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _NUMBER.search(_THOUSANDS.sub("", str(value)))
+    return float(match.group()) if match else None
+
+
+def coerce_properties(recipe, schema):
+    """Convert a recipe to properties matching ``schema``; missing numbers are left out."""
+    properties = {}
+    for name, data_type in schema.items():
+        value = recipe.get(name)
+        if data_type == wvcc.DataType.TEXT:
+            properties[name] = str(value)
+            continue
+        if data_type == wvcc.DataType.BOOL:
+            value = bool(value) if value is not None else None
+        else:
+            value = to_number(value)
+            if value is not None and data_type == wvcc.DataType.INT:
+                value = int(value)
+        if value is not None:
+            properties[name] = value
+    return properties
@@ -0,0 +1,315 @@
+"""Long-lived HTTP query service for recipe search and meal planning.
+
+The query scripts reconnect to Weaviate and reload the embedding model on
+every run, which takes seconds. This server does both once at startup and
+keeps them for its whole lifetime, so a request only pays for the query
+embedding and the search itself.
+
+Run it with::
+
+    uvicorn recipe_search.server:app --port 8000
+
+or ``python -m recipe_search.server``. Use a single worker process: every
+worker loads its own copy of the model.
+"""
+import json
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
+from langchain_weaviate.vectorstores import WeaviateVectorStore
+from pydantic import BaseModel, Field
+
+from recipe_search.bootstrap import Bootstrap
+from recipe_search.context import ContextBuilder
+from recipe_search.local_index import LocalVectorStore, index_path
+from recipe_search.planner import (
+    COLLECTIONS,
+    HYBRID_ALPHA,
+    RETURN_PROPERTIES,
+    hybrid_kwargs,
+    meal_query,
+    nutrition_conditions,
+    nutrition_filters,
+    recipe_results,
+    search_recipes,
+)
+from recipe_search.providers import check_collection
+from recipe_search.rag import astream_answer, build_rag_chain
+from recipe_search.rebuild import resolve_collection
+from recipe_search.rerank import Reranker
+from recipe_search.result_cache import ResultCache
+from recipe_search.telemetry import telemetry
+
+DEFAULT_COLLECTION = "RecipeST"
+RAG_COLLECTION = "RecipeV4"
+# How long a resolved alias is trusted before it is looked up again
+ALIAS_TTL = 60.0
+
+
+class QueryService:
+    """Keeps the embedding model, the Weaviate client and the vector stores warm.
+
+    With ``client=None`` the collections are served from the local indexes
+    in :mod:`recipe_search.local_index` instead of Weaviate. With an
+    :class:`recipe_search.providers.EmbeddingSpec`, collections built with a
+    different embedding model or dimension are refused.
+    """
+
+    def __init__(
+        self, client, embeddings, result_cache=None, alias_ttl=ALIAS_TTL, alpha=HYBRID_ALPHA, spec=None, reranker=None
+    ):
+        self.client = client
+        self.embeddings = embeddings
+        self.spec = spec
+        self.result_cache = result_cache or ResultCache()
+        self.alias_ttl = alias_ttl
+        # Hybrid search weight for requests that don't set one
+        self.alpha = alpha
+        # Loaded cross-encoders by model name, shared by the rerankers of all requests
+        self.cross_encoders = {}
+        # How /plan results are reranked for diversity when a request doesn't say
+        self.reranker = reranker or Reranker()
+        if self.reranker.cross_encoder is not None:
+            self.cross_encoders[self.reranker.cross_encoder.model_name] = self.reranker.cross_encoder
+        # alias -> (vector store, time it was resolved)
+        self.vectorstores = {}
+        self.llm = None
+        self.context_builder = ContextBuilder(max_tokens=int(os.getenv('RAG_CONTEXT_TOKENS', '1500')))
+
+    def vectorstore(self, name):
+        """Return the vector store behind ``name``, re-resolving the alias every ``alias_ttl`` seconds."""
+        cached = self.vectorstores.get(name)
+        if cached is not None and (self.client is None or time.monotonic() - cached[1] < self.alias_ttl):
+            return cached[0]
+        if self.client is None:
+            vectorstore = LocalVectorStore.load(name, self.embeddings, spec=self.spec)
+            self.vectorstores[name] = (vectorstore, time.monotonic())
+            return vectorstore
+        index_name = resolve_collection(self.client, name)
+        if self.spec is not None:
+            check_collection(self.client, index_name, self.spec)
+        vectorstore = WeaviateVectorStore(
+            client=self.client,
+            index_name=index_name,
+            text_key="title",
+            embedding=self.embeddings,
+        )
+        self.vectorstores[name] = (vectorstore, time.monotonic())
+        return vectorstore
+
+    def search(self, query, k=3, collection=DEFAULT_COLLECTION, conditions=(), alpha=None, timings=None, reranker=None):
+        """Return the top ``k`` recipes, from the result cache when an equal or similar query was seen.
+
+        ``conditions`` are nutrition conditions from
+        :func:`recipe_search.planner.nutrition_conditions`, applied as a
+        filter inside Weaviate. ``alpha`` weights vector against keyword
+        search and defaults to the service's ``alpha``. With a
+        :class:`recipe_search.rerank.Reranker` more candidates are fetched
+        and reranked for diversity. Search stage latencies are stored in
+        ``timings`` on a cache miss.
+        """
+        if alpha is None:
+            alpha = self.alpha
+
+        def run_search(text, vector):
+            # Pass the vector along so the query is not embedded a second time
+            search = search_recipes if reranker is None else reranker.search
+            results = search(
+                self.vectorstore(collection),
+                text,
+                k=k,
+                vector=vector,
+                filters=nutrition_filters(conditions),
+                timings=timings,
+                **hybrid_kwargs(alpha),
+            )
+            return recipe_results(results)
+
+        def embed(text):
+            with telemetry().span("query_embed"):
+                return self.embeddings.embed_query(text)
+
+        # Results for different filters or weights of the same query must not be shared
+        namespace = f"{collection}:{k}:{alpha}:{reranker!r}:" + ",".join(f"{field}{op}{value}" for field, op, value in conditions)
+        return self.result_cache.get_or_compute(query, run_search, embed=embed, namespace=namespace)
+
+    def plan_reranker(self, method=None, fetch_k=None, lambda_mult=None):
+        """The service's reranker, or one with these settings that reuses the loaded cross-encoders."""
+        if method is None and fetch_k is None and lambda_mult is None:
+            return self.reranker
+        return Reranker.from_env(method, fetch_k, lambda_mult, cross_encoders=self.cross_encoders)
+
+    def rag_chain(self):
+        """Return the RAG chain over the current version of the RAG collection."""
+        if self.llm is None:
+            # Only the RAG endpoint needs OpenAI, so import it when first used
+            from langchain_openai import ChatOpenAI
+
+            self.llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0, api_key=os.getenv("OPENAI_API_KEY"))
+        # Only the properties used in the prompt are fetched
+        retriever = self.vectorstore(RAG_COLLECTION).as_retriever(
+            search_kwargs={"return_properties": list(RETURN_PROPERTIES), **hybrid_kwargs(self.alpha)}
+        )
+        return build_rag_chain(retriever, self.llm, context_builder=self.context_builder)
+
+    def warm_up(self):
+        """Run the model and every collection once so the first request is not slow."""
+        self.embeddings.embed_query("warm up")
+        if self.reranker.cross_encoder is not None:
+            self.reranker.cross_encoder.load()
+        for name in COLLECTIONS:
+            if self.client is None:
+                exists = os.path.exists(index_path(name))
+            else:
+                exists = self.client.collections.exists(resolve_collection(self.client, name))
+            if exists:
+                self.vectorstore(name)
+
+    def close(self):
+        if self.client is not None:
+            self.client.close()
+
+
+def connect(boot=None):
+    """Create the service from the settings in the .env file, through a :class:`recipe_search.bootstrap.Bootstrap`."""
+    boot = boot or Bootstrap()
+    # With VECTOR_BACKEND=local the in-process indexes written by the createEmbeddings scripts are served
+    client = None if boot.local else boot.client()
+    result_cache = ResultCache(
+        ttl=float(boot.getenv('RESULT_CACHE_TTL', '3600')),
+        threshold=float(boot.getenv('RESULT_CACHE_THRESHOLD', '0.95')),
+    )
+    return QueryService(
+        client,
+        # Cache misses from concurrent requests are encoded together in one forward pass
+        boot.batched_embeddings(),
+        result_cache,
+        alpha=float(boot.getenv('SEARCH_ALPHA', HYBRID_ALPHA)),
+        spec=boot.spec,
+        reranker=Reranker.from_env(),
+    )
+
+
+class SearchRequest(BaseModel):
+    query: str
+    k: int = 3
+    collection: str = DEFAULT_COLLECTION
+    # 1 is pure vector search, 0 pure keyword search on title and ingredients
+    alpha: Optional[float] = Field(None, ge=0, le=1)
+
+
+class RagRequest(BaseModel):
+    question: str
+
+
+class PlanRequest(BaseModel):
+    meal_type: str
+    ingredients: str = ""
+    nutrition_goals: str = ""
+    any_other: str = ""
+    k: int = 4
+    collection: str = DEFAULT_COLLECTION
+    alpha: Optional[float] = Field(None, ge=0, le=1)
+    # Turn nutrition goals into filters on the numeric nutrition fields
+    filter_nutrition: bool = True
+    # mmr, cross-encoder or none; unset fields fall back to RERANK, RERANK_FETCH_K and MMR_LAMBDA
+    rerank: Optional[str] = None
+    fetch_k: Optional[int] = Field(None, ge=1)
+    mmr_lambda: Optional[float] = Field(None, ge=0, le=1)
+
+
+service = None
+
+
+@asynccontextmanager
+async def lifespan(app):
+    global service
+    service = connect()
+    service.warm_up()
+    try:
+        yield
+    finally:
+        service.close()
+
+
+app = FastAPI(title="Recipe search", lifespan=lifespan)
+
+
+def _search(query, k, collection, conditions=(), alpha=None, reranker=None):
+    if collection not in COLLECTIONS:
+        raise HTTPException(status_code=404, detail=f"Unknown collection {collection}")
+    start = time.perf_counter()
+    # Stays empty when the result comes from the cache
+    timings = {}
+    with telemetry().span("query", collection=collection):
+        results = service.search(
+            query, k=k, collection=collection, conditions=conditions, alpha=alpha, timings=timings, reranker=reranker
+        )
+    return {
+        "query": query,
+        "results": results,
+        "took_ms": round((time.perf_counter() - start) * 1000, 2),
+        "timings": timings,
+    }
+
+
+@app.get("/health")
+def health():
+    if service is None:
+        return {"status": "starting"}
+    return {"status": "ok" if service.client is None or service.client.is_ready() else "starting"}
+
+
+@app.get("/metrics")
+def metrics():
+    """Per-stage latency histograms in the Prometheus text format (METRICS_EXPORTER=prometheus)."""
+    if telemetry().histogram is None:
+        raise HTTPException(status_code=404, detail="Prometheus metrics are off; set METRICS_EXPORTER=prometheus")
+    from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+# Plain ``def`` endpoints run in the thread pool, so the blocking client
+# and model calls don't stall the event loop
+@app.post("/search")
+def search(request: SearchRequest):
+    return _search(request.query, request.k, request.collection, alpha=request.alpha)
+
+
+@app.post("/plan")
+def plan(request: PlanRequest):
+    query = meal_query(request.meal_type, request.ingredients, request.nutrition_goals, request.any_other)
+    conditions = nutrition_conditions(request.nutrition_goals) if request.filter_nutrition else ()
+    try:
+        reranker = service.plan_reranker(request.rerank, request.fetch_k, request.mmr_lambda)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return _search(query, request.k, request.collection, conditions, request.alpha, reranker)
+
+
+@app.post("/rag/stream")
+async def rag_stream(request: RagRequest):
+    """Stream the RAG answer as server-sent events, one ``data:`` event per chunk."""
+    # Resolving the alias and checking the collection are blocking Weaviate calls
+    chain = await run_in_threadpool(service.rag_chain)
+
+    async def events():
+        async for chunk in astream_answer(
+            chain, request.question, cache=service.result_cache, aembed=service.embeddings.aembed_query
+        ):
+            yield f"data: {json.dumps({'text': chunk})}\n\n"
+        yield "event: done\ndata: {}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host=os.getenv("HOST", "127.0.0.1"), port=int(os.getenv("PORT", "8000")))
@@ -0,0 +1,297 @@
+"""Columnar snapshots of embedded recipe collections in Arrow or Parquet.
+
+Encoding the corpus takes hours of CPU, and until now the vectors only
+lived inside Weaviate. A snapshot keeps recipes and vectors in one file
+so a collection can be rebuilt, or a new cluster filled, without
+re-encoding anything:
+
+- ``.arrow`` files use the uncompressed Arrow IPC format, which is
+  memory-mapped on read, so the vectors are used in place without being
+  copied or parsed.
+- ``.parquet`` files are compressed and smaller to ship, but are decoded
+  on read.
+
+Each file has a ``uuid`` column, one column per recipe property and a
+``vector`` column of fixed-size float32 lists. The schema metadata
+records the embedding model and dimension, the Weaviate data type of
+every property and the vectorizer of the source collection, so the
+collection can be recreated as it was.
+
+Snapshots are written by :class:`SnapshotWriter`, a batch for
+:func:`recipe_search.ingest.ingest` (combine it with the uploader through
+:class:`TeeBatch` to snapshot while ingesting), or exported from an
+existing collection with :func:`export_collection` or
+:func:`export_local_index`. :func:`read_snapshot` opens one and
+:func:`import_snapshot` adds its objects to any batch.
+"""
+import itertools
+import json
+import os
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+import weaviate.classes.config as wvcc
+
+from recipe_search.local_index import index_path
+from recipe_search.providers import EmbeddingSpec, recorded_embedding
+from recipe_search.schema import infer_schema
+
+# Rows per record batch (Arrow) or row group (Parquet)
+BATCH_ROWS = 10_000
+METADATA_KEY = b"recipe_search"
+
+ARROW_TYPES = {
+    wvcc.DataType.TEXT: pa.string(),
+    wvcc.DataType.NUMBER: pa.float64(),
+    wvcc.DataType.INT: pa.int64(),
+    wvcc.DataType.BOOL: pa.bool_(),
+}
+
+
+def _is_parquet(path):
+    return path.endswith((".parquet", ".pq"))
+
+
+class SnapshotWriter:
+    """Batch that writes the objects of one collection to a snapshot file.
+
+    ``schema`` is the ``{column: DataType}`` mapping from
+    :func:`recipe_search.schema.infer_schema`; it is inferred from the first
+    object when not given. ``metadata`` is stored with the snapshot, e.g.
+    ``EmbeddingSpec.metadata()``. Like :class:`recipe_search.local_index.LocalIndexWriter`
+    the file is written next to ``path`` and only replaces it when the batch
+    exits without an error. A batch that got no objects raises
+    ``ValueError`` rather than leave ``path`` unwritten silently.
+    """
+
+    def __init__(self, path, schema=None, metadata=None, batch_rows=BATCH_ROWS):
+        self.path = path
+        self.schema = schema
+        self.metadata = dict(metadata or {})
+        self.batch_rows = batch_rows
+        self.writer = None
+        self.sink = None
+        self.arrow_schema = None
+        self.collection = None
+        self.rows = []
+        self.count = 0
+        self.dim = None
+        self.failed = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            if self.rows:
+                self._write_rows()
+            self._close()
+            if self.writer is None:
+                raise ValueError(f"No recipes to snapshot; {self.path} was not written")
+            os.replace(self.path + ".tmp", self.path)
+            print(f"Wrote {self.count} recipes to the snapshot {self.path}.")
+        else:
+            self._close()
+            if os.path.exists(self.path + ".tmp"):
+                os.remove(self.path + ".tmp")
+        return False
+
+    def add_object(self, collection, properties=None, uuid=None, vector=None):
+        if vector is None:
+            raise ValueError("Snapshots need the object vectors; the server side vectorizer is not available")
+        if self.collection is None:
+            self.collection = collection
+        elif collection != self.collection:
+            raise ValueError(f"A snapshot holds one collection, got {collection} after {self.collection}")
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        if self.dim is None:
+            self.dim = len(vector)
+        elif len(vector) != self.dim:
+            raise ValueError(f"Vector has {len(vector)} dimensions, {collection} has {self.dim}")
+        self.rows.append((str(uuid) if uuid is not None else None, properties or {}, vector))
+        if len(self.rows) >= self.batch_rows:
+            self._write_rows()
+
+    def _arrow_schema(self):
+        if self.schema is None:
+            self.schema = infer_schema(self.rows[0][1])
+        fields = [pa.field("uuid", pa.string())]
+        fields += [pa.field(name, ARROW_TYPES[data_type]) for name, data_type in self.schema.items()]
+        fields.append(pa.field("vector", pa.list_(pa.float32(), self.dim)))
+        metadata = {
+            **self.metadata,
+            "collection": self.collection,
+            "dim": self.dim,
+            "schema": {name: data_type.value for name, data_type in self.schema.items()},
+        }
+        return pa.schema(fields, metadata={METADATA_KEY: json.dumps(metadata)})
+
+    def _write_rows(self):
+        if self.writer is None:
+            self.arrow_schema = self._arrow_schema()
+            tmp_path = self.path + ".tmp"
+            if _is_parquet(self.path):
+                self.writer = pq.ParquetWriter(tmp_path, self.arrow_schema)
+            else:
+                self.sink = pa.OSFile(tmp_path, "wb")
+                self.writer = pa.ipc.new_file(self.sink, self.arrow_schema)
+        schema = self.arrow_schema
+        columns = [pa.array([uuid for uuid, _, _ in self.rows], pa.string())]
+        for name in self.schema:
+            columns.append(pa.array([properties.get(name) for _, properties, _ in self.rows], schema.field(name).type))
+        flat = pa.array(np.concatenate([vector for _, _, vector in self.rows]), pa.float32())
+        columns.append(pa.FixedSizeListArray.from_arrays(flat, self.dim))
+        self.writer.write_table(pa.Table.from_arrays(columns, schema=schema))
+        self.count += len(self.rows)
+        self.rows = []
+
+    def _close(self):
+        if self.writer is not None:
+            self.writer.close()
+        if self.sink is not None:
+            self.sink.close()
+
+
+class TeeBatch:
+    """Batch that adds every object to several batches, e.g. an uploader and a :class:`SnapshotWriter`."""
+
+    def __init__(self, *batches):
+        self.batches = batches
+        self.open_batches = []
+
+    @property
+    def failed(self):
+        return [error for batch in self.batches for error in getattr(batch, "failed", [])]
+
+    def __enter__(self):
+        self.open_batches = [batch.__enter__() for batch in self.batches]
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Exit every batch even if an earlier one raises, then raise the first error
+        error = None
+        for batch in reversed(self.batches):
+            try:
+                batch.__exit__(exc_type, exc, tb)
+            except Exception as e:
+                error = error or e
+        if error is not None and exc_type is None:
+            raise error
+        return False
+
+    def add_object(self, collection, properties=None, uuid=None, vector=None):
+        for batch in self.open_batches:
+            batch.add_object(collection=collection, properties=properties, uuid=uuid, vector=vector)
+
+
+class Snapshot:
+    """A snapshot opened with :func:`read_snapshot`.
+
+    ``table`` is the Arrow table, memory-mapped for ``.arrow`` files, and
+    ``metadata`` what the writer recorded. ``schema`` maps each property to
+    its Weaviate ``DataType``.
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self.metadata = json.loads(table.schema.metadata[METADATA_KEY])
+        self.schema = {name: wvcc.DataType(value) for name, value in self.metadata["schema"].items()}
+        self.dim = self.metadata["dim"]
+
+    def __len__(self):
+        return self.table.num_rows
+
+    @property
+    def spec(self):
+        """The :class:`recipe_search.providers.EmbeddingSpec` the vectors were encoded with."""
+        return EmbeddingSpec(self.metadata["embedding"], dim=self.metadata.get("embedding_dim"))
+
+    def batches(self, batch_rows=BATCH_ROWS):
+        """Yield ``(uuids, properties, vectors)`` per record batch; ``vectors`` is an ``(n, dim)`` float32 view."""
+        for batch in self.table.to_batches(max_chunksize=batch_rows):
+            # flatten() honours the slice offset and, like to_numpy, copies nothing
+            vectors = batch.column("vector").flatten().to_numpy(zero_copy_only=True).reshape(-1, self.dim)
+            properties = batch.select(list(self.schema)).to_pylist()
+            # Missing numbers are left out, as coerce_properties does on ingest
+            properties = [{key: value for key, value in row.items() if value is not None} for row in properties]
+            yield batch.column("uuid").to_pylist(), properties, vectors
+
+    def vectors(self):
+        """The whole ``(len, dim)`` float32 vector matrix, without copying when the file has a single batch."""
+        column = self.table.column("vector")
+        chunks = [chunk.flatten().to_numpy(zero_copy_only=True) for chunk in column.chunks]
+        flat = chunks[0] if len(chunks) == 1 else np.concatenate(chunks)
+        return flat.reshape(-1, self.dim)
+
+
+def read_snapshot(path):
+    """Open a snapshot; ``.arrow`` files are memory-mapped rather than read."""
+    if _is_parquet(path):
+        return Snapshot(pq.read_table(path, memory_map=True))
+    # The table's buffers point into the mapping, which stays open as long as they do
+    return Snapshot(pa.ipc.open_file(pa.memory_map(path, "r")).read_all())
+
+
+def import_snapshot(batch, collection_name, snapshot, batch_rows=BATCH_ROWS):
+    """Add every object of ``snapshot`` to an open batch under its own UUID and vector; return the count."""
+    count = 0
+    for uuids, properties, vectors in snapshot.batches(batch_rows):
+        for uuid, props, vector in zip(uuids, properties, vectors):
+            batch.add_object(collection=collection_name, properties=props, uuid=uuid, vector=vector)
+        count += len(uuids)
+        print(f"Queued {count} of {len(snapshot)} recipes for {collection_name}.")
+    return count
+
+
+def export_collection(client, name, path, batch_rows=BATCH_ROWS):
+    """Write every object of the Weaviate collection ``name`` and its vector to ``path``; return the count."""
+    collection = client.collections.get(name)
+    config = collection.config.get()
+    model_name, dim = recorded_embedding(config.description)
+    vectorizer = config.vectorizer.value if config.vectorizer is not None else "none"
+    schema = {prop.name: prop.data_type for prop in config.properties if prop.data_type in ARROW_TYPES}
+    writer = SnapshotWriter(
+        path,
+        schema=schema,
+        metadata={"embedding": model_name, "embedding_dim": dim, "vectorizer": vectorizer},
+        batch_rows=batch_rows,
+    )
+    with writer:
+        for obj in collection.iterator(include_vector=True, return_properties=list(schema)):
+            writer.add_object(name, properties=obj.properties, uuid=obj.uuid, vector=obj.vector["default"])
+    return writer.count
+
+
+def _local_index_schema(objects_path, count):
+    """Infer the schema over every row, since rows leave out the numbers they are missing."""
+    schema = {}
+    with open(objects_path) as objects:
+        for line in itertools.islice(objects, count):
+            properties = {name: value for name, value in json.loads(line)["properties"].items() if value is not None}
+            for name, data_type in infer_schema(properties).items():
+                # A column with both ints and floats is a NUMBER
+                if name not in schema or schema[name] == wvcc.DataType.INT and data_type == wvcc.DataType.NUMBER:
+                    schema[name] = data_type
+    return schema
+
+
+def export_local_index(name, path, directory=None, batch_rows=BATCH_ROWS):
+    """Write the local index of collection ``name`` to ``path``; return the count."""
+    source = index_path(name, directory)
+    with open(os.path.join(source, "meta.json")) as f:
+        meta = json.load(f)
+    count, dim = meta["count"], meta["dim"]
+    vectors = np.memmap(os.path.join(source, "vectors.f32"), dtype=np.float32, mode="r", shape=(count, dim)) if count else []
+    objects_path = os.path.join(source, "objects.jsonl")
+    writer = SnapshotWriter(
+        path,
+        schema=_local_index_schema(objects_path, count),
+        metadata={"embedding": meta.get("embedding"), "embedding_dim": meta.get("embedding_dim"), "vectorizer": "none"},
+        batch_rows=batch_rows,
+    )
+    with writer, open(objects_path) as objects:
+        for line, vector in zip(objects, vectors):
+            record = json.loads(line)
+            writer.add_object(name, properties=record["properties"], uuid=record["uuid"], vector=vector)
+    return writer.count
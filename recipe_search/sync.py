@@ -0,0 +1,117 @@
+"""Incremental, idempotent sync of the recipe corpus into a collection.
+
+Every recipe gets a deterministic UUID derived from its identity columns,
+and a local manifest remembers the content hash that was last uploaded
+for each UUID. A sync run then only uploads recipes that are new or whose
+content changed, and deletes the objects whose recipes disappeared.
+Uploading a recipe under its deterministic UUID replaces the existing
+object, so re-running a sync after a failure is safe.
+"""
+import hashlib
+import json
+import os
+
+from weaviate.classes.query import Filter
+from weaviate.util import generate_uuid5
+
+from recipe_search.ingest import recipe_text
+
+MANIFEST_DIR = os.path.join(os.path.expanduser("~"), ".cache", "recipe_search", "manifests")
+
+# Columns that identify a recipe; the full content is used when none are present
+KEY_COLUMNS = ("url",)
+
+# Objects deleted per request
+DELETE_BATCH_SIZE = 500
+
+
+def recipe_uuid(recipe, key_columns=KEY_COLUMNS):
+    """Return the deterministic UUID of a recipe."""
+    key = [str(recipe[col]) for col in key_columns if recipe.get(col)]
+    return generate_uuid5(" ".join(key) if key else recipe_text(recipe))
+
+
+def content_hash(recipe):
+    """Return a hash of everything that is uploaded for a recipe."""
+    return hashlib.sha256(recipe_text(recipe).encode("utf-8")).hexdigest()
+
+
+class RecipeSync:
+    """Tracks what was last uploaded to a collection.
+
+    Typical use::
+
+        sync = RecipeSync("RecipeST")
+        uploader = AdaptiveUploader(weaviate_client)
+        ingest(uploader, "RecipeST", sync.changed(recipes), uuid_for=recipe_uuid)
+        sync.commit(collection, failed=uploader.failed)
+    """
+
+    def __init__(self, collection_name, manifest_dir=None, key_columns=KEY_COLUMNS):
+        self.collection_name = collection_name
+        self.key_columns = key_columns
+        manifest_dir = manifest_dir or os.getenv("SYNC_MANIFEST_DIR", MANIFEST_DIR)
+        self.path = os.path.join(manifest_dir, f"{collection_name}.json")
+        self.previous = {}
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                self.previous = json.load(f)
+        self.current = {}
+        self.inserted = 0
+        self.updated = 0
+
+    def __len__(self):
+        """Return the number of recipes in the manifest."""
+        return len(self.previous)
+
+    def reset(self):
+        """Forget the manifest, e.g. after the collection was recreated."""
+        self.previous = {}
+
+    def changed(self, rows):
+        """Yield only the recipes that are new or changed since the last sync."""
+        for recipe in rows:
+            uuid = recipe_uuid(recipe, self.key_columns)
+            digest = content_hash(recipe)
+            self.current[uuid] = digest
+            old_digest = self.previous.get(uuid)
+            if old_digest == digest:
+                continue
+            if old_digest is None:
+                self.inserted += 1
+            else:
+                self.updated += 1
+            yield recipe
+
+    def stale(self):
+        """Return the UUIDs that were uploaded before but are no longer in the corpus."""
+        return [uuid for uuid in self.previous if uuid not in self.current]
+
+    def commit(self, collection, failed=()):
+        """Delete stale objects and save the manifest.
+
+        ``failed`` are the objects that could not be uploaded, as in
+        ``client.batch.failed_objects``; they are left out of the
+        manifest so that the next sync uploads them again.
+        """
+        stale = self.stale()
+        for start in range(0, len(stale), DELETE_BATCH_SIZE):
+            ids = stale[start:start + DELETE_BATCH_SIZE]
+            collection.data.delete_many(where=Filter.by_id().contains_any(ids))
+
+        for error in failed:
+            uuid = str(error.object_.uuid)
+            if uuid in self.previous:
+                self.current[uuid] = self.previous[uuid]
+            else:
+                self.current.pop(uuid, None)
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.current, f)
+        os.replace(tmp_path, self.path)
+
+        print(f"{self.collection_name}: {self.inserted} inserted, {self.updated} updated, "
+              f"{len(stale)} deleted, {len(failed)} failed.")
+        self.previous, self.current = self.current, {}
@@ -0,0 +1,176 @@
+"""Per-stage timing of the ingest, query and RAG hot paths.
+
+The pipelines record how long each stage takes through :func:`telemetry`:
+
+- ingest: ``dataset_load``, ``text_assembly``, ``encode``, ``upload`` and
+  ``upload_send`` (one window sent by :class:`recipe_search.upload.AdaptiveUploader`),
+- query: ``query_embed``, ``ann_search`` (which includes parsing the
+  search response, done inside the client) and ``result_format``
+  (turning the hits into what the caller returns or prints), under a
+  ``query`` span per query server request,
+- RAG: ``retrieve``, ``prompt_build``, ``llm_first_token`` and ``llm_call``.
+
+By default nothing is recorded and a stage costs two ``perf_counter``
+calls. METRICS_EXPORTER in the .env file turns exporters on, as a comma
+separated list:
+
+- ``prometheus``: a ``recipe_search_stage_seconds`` histogram labelled by
+  stage (``pip install prometheus-client``). The query server serves it on
+  GET /metrics; METRICS_PORT starts a standalone scrape endpoint, and
+  METRICS_PUSHGATEWAY pushes the histogram to a Pushgateway when a
+  script exits, for short-lived ingest runs.
+- ``otel``: an OpenTelemetry span per stage, nested under the enclosing
+  stage (``pip install opentelemetry-sdk``). Spans go to the global tracer
+  provider; if none is set up and the OTLP exporter is installed
+  (``pip install opentelemetry-exporter-otlp``), one exporting to
+  OTEL_EXPORTER_OTLP_ENDPOINT is installed.
+"""
+import atexit
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Buckets from 0.5 ms to 60 s: query stages are milliseconds, ingest chunks and LLM calls seconds
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_histogram = None
+
+
+def _stage_histogram():
+    # Registered once per process: prometheus_client refuses duplicate metric names
+    global _histogram
+    if _histogram is None:
+        from prometheus_client import Histogram
+
+        _histogram = Histogram(
+            "recipe_search_stage_seconds",
+            "Time spent in each pipeline stage.",
+            labelnames=("stage",),
+            buckets=BUCKETS,
+        )
+    return _histogram
+
+
+def _otel_tracer():
+    from opentelemetry import trace
+
+    if isinstance(trace.get_tracer_provider(), trace.ProxyTracerProvider):
+        try:
+            from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+            from opentelemetry.sdk.trace import TracerProvider
+            from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        except ImportError:
+            pass
+        else:
+            provider = TracerProvider()
+            provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+            trace.set_tracer_provider(provider)
+            # Spans still buffered when a script exits are exported first
+            atexit.register(provider.shutdown)
+    return trace.get_tracer("recipe_search")
+
+
+class Telemetry:
+    """Records stage durations into a Prometheus histogram and OpenTelemetry spans.
+
+    With neither ``histogram`` nor ``tracer`` it records nothing.
+    """
+
+    def __init__(self, histogram=None, tracer=None):
+        self.histogram = histogram
+        self.tracer = tracer
+
+    @property
+    def enabled(self):
+        return self.histogram is not None or self.tracer is not None
+
+    def record(self, stage, seconds, **attributes):
+        """Record a stage that was timed elsewhere, e.g. by a LangChain callback."""
+        if self.histogram is not None:
+            self.histogram.labels(stage=stage).observe(seconds)
+        if self.tracer is not None:
+            end = time.time_ns()
+            span = self.tracer.start_span(stage, start_time=end - int(seconds * 1e9), attributes=attributes)
+            span.end(end_time=end)
+
+    @contextmanager
+    def span(self, stage, **attributes):
+        """Time the body as ``stage``; spans opened inside it become its children."""
+        start = time.perf_counter()
+        if self.tracer is None:
+            try:
+                yield
+            finally:
+                if self.histogram is not None:
+                    self.histogram.labels(stage=stage).observe(time.perf_counter() - start)
+            return
+        with self.tracer.start_as_current_span(stage, attributes=attributes):
+            try:
+                yield
+            finally:
+                if self.histogram is not None:
+                    self.histogram.labels(stage=stage).observe(time.perf_counter() - start)
+
+    def timed(self, stage, items):
+        """Yield from ``items``, recording the time each ``next`` takes as ``stage``."""
+        items = iter(items)
+        while True:
+            with self.span(stage):
+                item = next(items, _DONE)
+            if item is _DONE:
+                return
+            yield item
+
+
+_DONE = object()
+_telemetry = None
+_lock = threading.Lock()
+
+
+def from_env():
+    """Build the :class:`Telemetry` selected by METRICS_EXPORTER and start its exporters."""
+    exporters = {name.strip() for name in os.getenv("METRICS_EXPORTER", "").lower().split(",") if name.strip()}
+    unknown = exporters - {"prometheus", "otel"}
+    if unknown:
+        raise ValueError(f"Unknown METRICS_EXPORTER {', '.join(sorted(unknown))}, expected prometheus or otel")
+
+    histogram = tracer = None
+    if "prometheus" in exporters:
+        import prometheus_client
+
+        histogram = _stage_histogram()
+        if os.getenv("METRICS_PORT"):
+            prometheus_client.start_http_server(int(os.getenv("METRICS_PORT")))
+        gateway = os.getenv("METRICS_PUSHGATEWAY")
+        if gateway:
+            atexit.register(
+                prometheus_client.push_to_gateway,
+                gateway,
+                job=os.getenv("METRICS_JOB", "recipe_search"),
+                registry=prometheus_client.REGISTRY,
+            )
+    if "otel" in exporters:
+        tracer = _otel_tracer()
+    return Telemetry(histogram, tracer)
+
+
+def telemetry():
+    """Return the process-wide :class:`Telemetry`, configured from the environment on first use.
+
+    The scripts load their .env file before anything is timed, so the first
+    call sees its METRICS_* settings.
+    """
+    global _telemetry
+    if _telemetry is None:
+        # Exporters such as the scrape endpoint must only be started once
+        with _lock:
+            if _telemetry is None:
+                _telemetry = from_env()
+    return _telemetry
+
+
+def set_telemetry(instance):
+    """Replace the process-wide :class:`Telemetry`, e.g. with ``Telemetry()`` to turn it off."""
+    global _telemetry
+    _telemetry = instance
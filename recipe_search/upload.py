@@ -0,0 +1,223 @@
+"""Batch uploads with adaptive concurrency and retry of failed objects.
+
+The v4 client never raises from ``batch.add_object`` when the server
+throttles; throttled objects end up in ``client.batch.failed_objects``
+once the batch is flushed. ``AdaptiveUploader`` sends objects in windows,
+reads the failed objects of each window, and re-queues only the ones that
+failed for a transient reason (429, 503, gRPC UNAVAILABLE, ...). Retries
+wait for the server's ``Retry-After`` hint when there is one, and for a
+jittered exponential backoff otherwise.
+
+Concurrency is adjusted like TCP congestion control: it goes up by one
+request after every clean window and is halved when a window is
+throttled, so uploads settle at what the server can actually take.
+
+Windows are sent from a background thread, so the caller keeps encoding
+the next window while the previous one uploads. At most one window is
+queued behind the one being sent, which bounds the uploader to about
+three windows of objects in memory.
+"""
+import queue
+import random
+import re
+import threading
+import time
+
+from recipe_search.telemetry import telemetry
+
+BATCH_SIZE = 100
+CONCURRENCY = 2
+MAX_CONCURRENCY = 16
+# Objects sent per batch context before failures are checked
+WINDOW = 2000
+MAX_RETRIES = 5
+BASE_DELAY = 1.0
+MAX_DELAY = 60.0
+
+RETRYABLE_ERRORS = (
+    "429",
+    "503",
+    "rate limit",
+    "too many requests",
+    "unavailable",
+    "resource_exhausted",
+    "deadline_exceeded",
+    "timed out",
+    "timeout",
+    "model is currently loading",
+)
+
+_RETRY_AFTER = re.compile(r"retry[- ]after\D{0,5}(\d+(?:\.\d+)?)", re.IGNORECASE)
+
+
+def is_retryable(message):
+    """Return whether an error message describes a transient failure."""
+    message = message.lower()
+    return any(error in message for error in RETRYABLE_ERRORS)
+
+
+def retry_after(message):
+    """Return the ``Retry-After`` delay in seconds found in an error message, if any."""
+    match = _RETRY_AFTER.search(message)
+    return float(match.group(1)) if match else None
+
+
+def backoff_delay(attempt, base_delay=BASE_DELAY, max_delay=MAX_DELAY):
+    """Return a full-jitter exponential backoff delay for the given attempt."""
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+class AdaptiveUploader:
+    """Context manager with the ``add_object`` interface of a Weaviate batch.
+
+    Objects are buffered and sent ``window`` at a time through
+    ``client.batch.fixed_size``, from a background thread while the batch
+    is open. An error in that thread is raised from the next
+    ``add_object`` or from the exit of the batch. Objects that still fail
+    after ``max_retries`` retries, or fail for a non transient reason, are
+    kept in ``failed`` in the same form as ``client.batch.failed_objects``.
+    """
+
+    def __init__(
+        self,
+        client,
+        batch_size=BATCH_SIZE,
+        concurrency=CONCURRENCY,
+        max_concurrency=MAX_CONCURRENCY,
+        window=WINDOW,
+        max_retries=MAX_RETRIES,
+        base_delay=BASE_DELAY,
+        max_delay=MAX_DELAY,
+    ):
+        self.client = client
+        self.max_batch_size = batch_size
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.max_concurrency = max_concurrency
+        self.window = window
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.pending = []
+        self.failed = []
+        self.sent = 0
+        self.retried = 0
+        self.windows = None
+        self.sender = None
+        self.error = None
+
+    def __enter__(self):
+        self.windows = queue.Queue(maxsize=1)
+        self.sender = threading.Thread(target=self._send_windows, daemon=True)
+        self.sender.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if exc_type is None:
+                self.flush()
+        finally:
+            # Windows already queued are still sent; objects not yet queued are dropped on error
+            self.windows.put(None)
+            self.sender.join()
+            self.windows = self.sender = None
+
+    def add_object(self, collection, properties=None, uuid=None, vector=None):
+        self._raise_error()
+        self.pending.append({"collection": collection, "properties": properties, "uuid": uuid, "vector": vector})
+        if len(self.pending) >= self.window:
+            self._queue_pending()
+
+    def _raise_error(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def _queue_pending(self):
+        objects, self.pending = self.pending, []
+        if self.windows is None:
+            # Outside a ``with`` block there is no sender thread
+            self._send_window(objects)
+        else:
+            # Blocks while a window is already waiting, so the caller can't run ahead unbounded
+            self.windows.put(objects)
+
+    def _send_windows(self):
+        while True:
+            objects = self.windows.get()
+            try:
+                if objects is None:
+                    return
+                if self.error is None:
+                    self._send_window(objects)
+            except BaseException as e:
+                self.error = e
+            finally:
+                self.windows.task_done()
+
+    def _send(self, objects):
+        with telemetry().span("upload_send", objects=len(objects), concurrency=self.concurrency):
+            with self.client.batch.fixed_size(batch_size=self.batch_size, concurrent_requests=self.concurrency) as batch:
+                for obj in objects:
+                    batch.add_object(**obj)
+        return self.client.batch.failed_objects
+
+    def _speed_up(self):
+        if self.batch_size < self.max_batch_size:
+            self.batch_size = min(self.max_batch_size, self.batch_size * 2)
+        elif self.concurrency < self.max_concurrency:
+            self.concurrency += 1
+
+    def _slow_down(self):
+        if self.concurrency > 1:
+            self.concurrency //= 2
+        else:
+            self.batch_size = max(1, self.batch_size // 2)
+
+    def flush(self):
+        """Send every buffered object, retrying transient failures, and wait until they are sent."""
+        if self.pending:
+            self._queue_pending()
+        if self.windows is not None:
+            self.windows.join()
+        self._raise_error()
+
+    def _send_window(self, objects):
+        attempt = 0
+        while objects:
+            retry = []
+            hints = []
+            failed = 0
+            gave_up = False
+            for error in self._send(objects):
+                retryable = is_retryable(error.message)
+                if retryable and attempt < self.max_retries:
+                    obj = error.object_
+                    retry.append({
+                        "collection": obj.collection,
+                        "properties": obj.properties,
+                        "uuid": obj.uuid,
+                        "vector": obj.vector,
+                    })
+                    hint = retry_after(error.message)
+                    if hint is not None:
+                        hints.append(hint)
+                else:
+                    self.failed.append(error)
+                    failed += 1
+                    gave_up = gave_up or retryable
+            self.sent += len(objects) - len(retry) - failed
+
+            if not retry:
+                # A window still throttled after the last retry is no reason to send faster
+                if not gave_up:
+                    self._speed_up()
+                return
+            self._slow_down()
+            delay = max(hints) if hints else backoff_delay(attempt, self.base_delay, self.max_delay)
+            print(f"{len(retry)} objects throttled, retrying in {delay:.1f}s "
+                  f"(batch size {self.batch_size}, {self.concurrency} concurrent requests)...")
+            time.sleep(delay)
+            self.retried += len(retry)
+            objects = retry
+            attempt += 1
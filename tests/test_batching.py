@@ -0,0 +1,62 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from recipe_search.batching import BatchedEmbeddings, QueryBatcher
+
+
+class FakeEncoder:
+    """Records every batch it encodes; a text's vector is its length."""
+
+    def __init__(self, error=None):
+        self.calls = []
+        self.error = error
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        if self.error is not None:
+            raise self.error
+        return [[float(len(text))] for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def test_concurrent_queries_are_encoded_in_one_call():
+    encoder = FakeEncoder()
+    embeddings = BatchedEmbeddings(encoder, max_batch_size=4, max_wait_ms=5000)
+    texts = ["soup", "stew", "salad", "cake"]
+    with ThreadPoolExecutor(len(texts)) as pool:
+        vectors = list(pool.map(embeddings.embed_query, texts))
+    assert vectors == [[4.0], [4.0], [5.0], [4.0]]
+    assert len(encoder.calls) == 1
+    assert sorted(encoder.calls[0]) == sorted(texts)
+
+
+def test_batches_are_capped_at_the_batch_size():
+    encoder = FakeEncoder()
+    batcher = QueryBatcher(encoder.embed_documents, max_batch_size=2, max_wait_ms=200)
+    futures = [batcher.submit(text) for text in ["a", "bb", "ccc", "dddd", "eeeee"]]
+    assert [future.result(timeout=5) for future in futures] == [[1.0], [2.0], [3.0], [4.0], [5.0]]
+    assert max(len(call) for call in encoder.calls) == 2
+    assert sum(len(call) for call in encoder.calls) == 5
+
+
+def test_a_lone_query_is_sent_when_the_wait_ends():
+    encoder = FakeEncoder()
+    batcher = QueryBatcher(encoder.embed_documents, max_batch_size=32, max_wait_ms=50)
+    start = time.monotonic()
+    assert batcher.embed("soup") == [4.0]
+    assert 0.04 <= time.monotonic() - start < 2
+    assert encoder.calls == [["soup"]]
+
+
+def test_an_encoder_error_reaches_every_waiting_query():
+    encoder = FakeEncoder(error=RuntimeError("model crashed"))
+    batcher = QueryBatcher(encoder.embed_documents, max_batch_size=3, max_wait_ms=5000)
+    futures = [batcher.submit(text) for text in ["soup", "stew", "cake"]]
+    for future in futures:
+        with pytest.raises(RuntimeError, match="model crashed"):
+            future.result(timeout=5)
+    assert len(encoder.calls) == 1
@@ -0,0 +1,67 @@
+import numpy as np
+
+from recipe_search.cache import EmbeddingCache, cached_encoder, content_key
+
+
+def key(text):
+    return content_key("model", text)
+
+
+def test_least_recently_used_row_is_reused(tmp_path):
+    cache = EmbeddingCache("model", cache_dir=str(tmp_path), max_entries=2)
+    cache.put_many([key("a"), key("b")], [[1, 1], [2, 2]])
+    cache.get_many([key("a")])
+    cache.put_many([key("c")], [[3, 3]])
+
+    a, b, c = cache.get_many([key("a"), key("b"), key("c")])
+    assert b is None
+    np.testing.assert_array_equal(a, [1, 1])
+    np.testing.assert_array_equal(c, [3, 3])
+
+
+def test_flushed_cache_is_reloaded(tmp_path):
+    cache = EmbeddingCache("model", cache_dir=str(tmp_path), max_entries=4)
+    cache.put_many([key("a")], [[1, 2, 3]])
+    cache.flush()
+
+    reloaded = EmbeddingCache("model", cache_dir=str(tmp_path), max_entries=4)
+    np.testing.assert_array_equal(reloaded.get_many([key("a")])[0], [1, 2, 3])
+    assert EmbeddingCache("other", cache_dir=str(tmp_path), max_entries=4).get_many([key("a")]) == [None]
+
+
+def test_processes_sharing_the_cache_keep_their_rows(tmp_path):
+    # Two instances stand in for a server and an ingest using the same directory
+    server = EmbeddingCache("model", cache_dir=str(tmp_path), max_entries=4)
+    server.put_many([key("query")], [[7, 7, 7, 7]])
+    ingest = EmbeddingCache("model", cache_dir=str(tmp_path), max_entries=4)
+    ingest.put_many([key("doc")], [[-3, -3, -3, -3]])
+
+    np.testing.assert_array_equal(server.get_many([key("query")])[0], [7, 7, 7, 7])
+    np.testing.assert_array_equal(ingest.get_many([key("doc")])[0], [-3, -3, -3, -3])
+
+
+def test_overwritten_row_is_a_miss(tmp_path):
+    server = EmbeddingCache("model", cache_dir=str(tmp_path), max_entries=1)
+    server.put_many([key("query")], [[7, 7]])
+    # A full cache: the other process has to reuse the only row
+    ingest = EmbeddingCache("model", cache_dir=str(tmp_path), max_entries=1)
+    ingest.put_many([key("doc")], [[-3, -3]])
+
+    assert server.get_many([key("query")]) == [None]
+    np.testing.assert_array_equal(ingest.get_many([key("doc")])[0], [-3, -3])
+
+
+def test_cached_encoder_only_encodes_misses(tmp_path):
+    cache = EmbeddingCache("model", cache_dir=str(tmp_path), max_entries=8)
+    encoded = []
+
+    def encode(texts):
+        encoded.extend(texts)
+        return [[len(text), 0] for text in texts]
+
+    encode_with_cache = cached_encoder(encode, cache)
+    encode_with_cache(["a", "bb"])
+    vectors = encode_with_cache(["bb", "ccc"])
+
+    assert encoded == ["a", "bb", "ccc"]
+    np.testing.assert_array_equal(vectors, [[2, 0], [3, 0]])
@@ -0,0 +1,51 @@
+import pytest
+from langchain_core.documents import Document
+
+from recipe_search import context
+from recipe_search.context import ContextBuilder
+
+
+class WordEncoding:
+    """One token per whitespace separated word, so budgets are easy to count."""
+
+    def encode(self, text):
+        return text.split()
+
+    def decode(self, tokens):
+        return " ".join(tokens)
+
+
+@pytest.fixture(autouse=True)
+def word_tokens(monkeypatch):
+    monkeypatch.setattr(context.tiktoken, "encoding_for_model", lambda model_name: WordEncoding())
+
+
+def recipe(title, **metadata):
+    return Document(page_content=title, metadata=metadata)
+
+
+def test_only_whitelisted_fields_are_kept():
+    document = recipe("Potato soup", calories=250, ingredients="potato, leek", url="https://example.com", embedding=[0.1], fat_g="")
+    assert ContextBuilder().build([document]) == "Title: Potato soup\nIngredients: potato, leek\nCalories: 250"
+    assert ContextBuilder(fields=("url",)).build([document]) == "Title: Potato soup\nurl: https://example.com"
+
+
+def test_duplicate_recipes_are_dropped():
+    reports = []
+    builder = ContextBuilder(report=reports.append)
+    built = builder.build([recipe("Potato Soup", calories=250), recipe("potato soup!", calories=300), recipe("Stew")])
+    assert built == "Title: Potato Soup\nCalories: 250\n\nTitle: Stew"
+    assert reports == [{"retrieved": 3, "recipes": 2, "context_tokens": 8}]
+
+
+def test_recipes_stop_at_the_token_budget():
+    documents = [recipe(f"Recipe {i}", calories=100 * i) for i in range(1, 5)]
+    # Each block is 4 tokens and each separator 1, so two recipes take 9
+    built = ContextBuilder(max_tokens=12).build(documents)
+    assert built == "Title: Recipe 1\nCalories: 100\n\nTitle: Recipe 2\nCalories: 200"
+    assert len(built.split()) <= 12
+
+
+def test_a_first_recipe_over_the_budget_is_truncated():
+    built = ContextBuilder(max_tokens=3).build([recipe("Very long potato soup", calories=250)])
+    assert built == "Title: Very long"
@@ -0,0 +1,74 @@
+from langchain_core.embeddings import Embeddings
+from weaviate.classes.query import Filter
+
+from recipe_search.local_index import LocalIndexWriter, LocalVectorStore
+
+WORDS = ["potato", "chicken", "cake"]
+
+
+class WordEmbeddings(Embeddings):
+    """One dimension per word of WORDS, counting how often it occurs."""
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        text = text.lower()
+        return [float(text.count(word)) + 0.01 for word in WORDS]
+
+
+RECIPES = [
+    {"title": "Potato soup", "calories": 250},
+    {"title": "Potato gratin", "calories": 600},
+    {"title": "Roast chicken", "calories": 450},
+    {"title": "Chocolate cake", "calories": 700},
+]
+
+
+def write_index(directory):
+    embeddings = WordEmbeddings()
+    with LocalIndexWriter(str(directory), build_hnsw=False) as writer:
+        for recipe in RECIPES:
+            writer.add_object("Recipes", properties=recipe, vector=embeddings.embed_query(recipe["title"]))
+    return LocalVectorStore.load("Recipes", embeddings, directory=str(directory))
+
+
+def titles(documents):
+    return [document.page_content for document in documents]
+
+
+def test_hybrid_search_ranks_matching_recipes_first(tmp_path):
+    store = write_index(tmp_path)
+    assert set(titles(store.similarity_search("potato", k=2))) == {"Potato gratin", "Potato soup"}
+    assert titles(store.similarity_search("chicken", k=1, alpha=0)) == ["Roast chicken"]
+
+
+def test_filters_restrict_the_results(tmp_path):
+    store = write_index(tmp_path)
+    light = Filter.by_property("calories").less_than(500)
+    assert set(titles(store.similarity_search("potato", k=4, filters=light))) == {"Potato soup", "Roast chicken"}
+    documents = store.similarity_search("potato", k=4, filters=light & Filter.by_property("title").like("potato*"))
+    assert titles(documents) == ["Potato soup"]
+    assert documents[0].metadata == {"calories": 250}
+
+
+def test_added_texts_are_searchable_and_persisted(tmp_path):
+    store = write_index(tmp_path)
+    ids = store.add_texts(["Cake pops"], metadatas=[{"calories": 300}])
+    assert len(store) == 5
+    light = Filter.by_property("calories").less_than(500)
+    assert titles(store.similarity_search("cake", k=1, filters=light)) == ["Cake pops"]
+
+    reopened = LocalVectorStore.load("Recipes", WordEmbeddings(), directory=str(tmp_path))
+    documents = reopened.similarity_search("cake", k=1, filters=light, return_uuids=True)
+    assert titles(documents) == ["Cake pops"]
+    assert documents[0].metadata["uuid"] == ids[0]
+
+
+def test_from_texts_writes_a_new_index(tmp_path):
+    store = LocalVectorStore.from_texts(
+        ["Potato soup", "Chocolate cake"], WordEmbeddings(), metadatas=[{"calories": 250}, {"calories": 700}],
+        index_name="Desserts", directory=str(tmp_path),
+    )
+    assert titles(store.similarity_search("cake", k=1)) == ["Chocolate cake"]
+    assert len(LocalVectorStore.load("Desserts", WordEmbeddings(), directory=str(tmp_path))) == 2
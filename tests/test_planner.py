@@ -0,0 +1,36 @@
+from recipe_search.planner import nutrition_conditions, nutrition_filters
+from recipe_search.schema import to_number
+
+
+def test_named_goals_use_their_thresholds():
+    assert sorted(nutrition_conditions("High protein, low-carb please")) == [
+        ("carbohydrates_g", "<=", 20),
+        ("protein_g", ">=", 20),
+    ]
+
+
+def test_explicit_limits_override_named_goals():
+    assert nutrition_conditions("low calorie, calories <= 300.5") == [("calories", "<=", 300.5)]
+    assert nutrition_conditions("Carbs<50 and fat > 5") == [("carbohydrates_g", "<", 50.0), ("fat_g", ">", 5.0)]
+
+
+def test_words_without_goals_give_no_conditions():
+    assert nutrition_conditions("fatty stew, proteinaceous, calories please") == []
+    assert nutrition_conditions(None) == []
+    assert nutrition_filters([]) is None
+
+
+def test_conditions_become_one_filter():
+    filters = nutrition_filters([("protein_g", ">=", 20), ("calories", "<", 500)])
+    assert [(f.target, f.operator.value, f.value) for f in filters.filters] == [
+        ("protein_g", "GreaterThanEqual", 20),
+        ("calories", "LessThan", 500),
+    ]
+
+
+def test_numbers_with_thousands_separators_are_parsed_whole():
+    assert to_number("1,200 kcal") == 1200.0
+    assert to_number("12,345,678") == 12345678.0
+    assert to_number("1,500mg") == 1500.0
+    assert to_number("3.5 g") == 3.5
+    assert to_number("no data") is None
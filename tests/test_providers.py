@@ -0,0 +1,50 @@
+import pytest
+
+from recipe_search.providers import EMBEDDING_MODEL, EmbeddingSpec, check_embedding, recorded_embedding
+
+MINI = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+def test_the_description_records_model_and_dimension():
+    assert recorded_embedding(EmbeddingSpec(MINI, dim=256).description()) == (MINI, 256)
+    assert recorded_embedding(EmbeddingSpec(MINI).description()) == (MINI, None)
+
+
+def test_collections_without_a_record_used_the_default_model():
+    assert recorded_embedding("A collection to store recipes") == (EMBEDDING_MODEL, None)
+    assert recorded_embedding(None) == (EMBEDDING_MODEL, None)
+
+
+def test_another_model_or_dimension_is_refused():
+    spec = EmbeddingSpec(MINI, backend="onnx-int8", dim=256)
+    # The backend doesn't change the vectors a collection can be queried with
+    check_embedding(spec, "RecipeST", MINI, 256)
+    with pytest.raises(RuntimeError, match="RecipeST was built with"):
+        check_embedding(spec, "RecipeST", EMBEDDING_MODEL, 256)
+    with pytest.raises(RuntimeError, match="full dimensions"):
+        check_embedding(spec, "RecipeST", MINI, None)
+
+
+def test_cache_names_differ_per_model_backend_and_dimension():
+    names = {
+        EmbeddingSpec().cache_name,
+        EmbeddingSpec(MINI).cache_name,
+        EmbeddingSpec(MINI, backend="onnx").cache_name,
+        EmbeddingSpec(MINI, backend="onnx-int8").cache_name,
+        EmbeddingSpec(MINI, dim=256).cache_name,
+        EmbeddingSpec(MINI, backend="onnx", dim=256).cache_name,
+    }
+    assert len(names) == 6
+    assert EmbeddingSpec(MINI, backend="onnx", dim=256).cache_name == f"{MINI}@onnx/256"
+
+
+def test_onnx_backends_load_through_sentence_transformers_onnx():
+    assert EmbeddingSpec(MINI).model_kwargs() == {"device": "cpu"}
+    assert EmbeddingSpec(MINI, backend="onnx-int8", dim=256).model_kwargs() == {
+        "device": "cpu",
+        "backend": "onnx",
+        "model_kwargs": {"file_name": "onnx/model_qint8_avx512_vnni.onnx"},
+        "truncate_dim": 256,
+    }
+    with pytest.raises(ValueError, match="Unknown embedding backend"):
+        EmbeddingSpec(MINI, backend="openvino")
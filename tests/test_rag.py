@@ -0,0 +1,34 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from recipe_search.rag import AsyncWeaviateRetriever
+
+
+class FakeEmbeddings:
+    async def aembed_query(self, text):
+        return [1.0, 0.0]
+
+
+class FakeQuery:
+    async def hybrid(self, query, limit, **kwargs):
+        objects = [SimpleNamespace(properties={"title": f"{query} {i}", "calories": i}) for i in range(limit)]
+        return SimpleNamespace(objects=objects)
+
+
+def retriever():
+    collection = SimpleNamespace(query=FakeQuery())
+    client = SimpleNamespace(collections=SimpleNamespace(get=lambda name: collection))
+    return AsyncWeaviateRetriever(client=client, index_name="RecipeST", embeddings=FakeEmbeddings(), k=2)
+
+
+def test_ainvoke_returns_titles_as_page_content():
+    documents = asyncio.run(retriever().ainvoke("soup"))
+    assert [document.page_content for document in documents] == ["soup 0", "soup 1"]
+    assert documents[1].metadata == {"calories": 1}
+
+
+def test_invoke_points_to_ainvoke():
+    with pytest.raises(RuntimeError, match="ainvoke"):
+        retriever().invoke("soup")
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+from recipe_search.local_index import LocalIndexWriter, LocalVectorStore, index_path
+from recipe_search.rerank import Reranker, mmr, rerank
+
+# A query along x, two near-duplicates of the best match and two other dishes
+QUERY = [1.0, 0.0]
+VECTORS = [[1, 0], [0.99, 0.05], [0.98, 0.1], [0.6, 0.8], [0.5, 0.86]]
+
+
+class FixedEmbeddings:
+    def embed_query(self, text):
+        return QUERY
+
+
+def test_mmr_with_full_relevance_keeps_the_similarity_order():
+    assert mmr(QUERY, VECTORS, 3, lambda_mult=1.0) == [0, 1, 2]
+
+
+def test_mmr_skips_near_duplicates():
+    assert mmr(QUERY, VECTORS, 3, lambda_mult=0.3) == [0, 4, 2]
+
+
+def test_mmr_uses_the_given_relevance():
+    assert mmr(QUERY, VECTORS, 1, relevance=[0, 0, 0, 1, 0]) == [3]
+
+
+def test_mmr_of_nothing():
+    assert mmr(QUERY, np.empty((0, 2)), 3) == []
+    assert mmr(QUERY, VECTORS, 0) == []
+
+
+def test_rerank_removes_the_vectors():
+    documents = [Document(page_content=str(i), metadata={"vector": vector}) for i, vector in enumerate(VECTORS)]
+    results = rerank("q", QUERY, documents, 2, lambda_mult=0.3)
+    assert [document.page_content for document in results] == ["0", "4"]
+    assert all("vector" not in document.metadata for document in documents)
+
+
+def test_rerank_without_vectors_keeps_the_order():
+    documents = [Document(page_content=str(i)) for i in range(3)]
+    assert rerank("q", QUERY, documents, 2) == documents[:2]
+
+
+def test_unknown_reranker():
+    with pytest.raises(ValueError):
+        Reranker("random")
+
+
+def test_rerankers_share_cross_encoders():
+    cross_encoders = {}
+    first = Reranker("cross-encoder", cross_encoders=cross_encoders)
+    second = Reranker("cross-encoder", lambda_mult=0.2, cross_encoders=cross_encoders)
+    assert first.cross_encoder is second.cross_encoder
+    assert list(cross_encoders) == [first.cross_encoder.model_name]
+    assert Reranker("mmr", cross_encoders=cross_encoders).cross_encoder is None
+
+
+def test_search_reranks_local_index(tmp_path):
+    with LocalIndexWriter(str(tmp_path)) as writer:
+        for i, vector in enumerate(VECTORS):
+            writer.add_object(collection="Recipes", properties={"title": f"recipe {i}"}, vector=vector)
+    vectorstore = LocalVectorStore(index_path("Recipes", str(tmp_path)), FixedEmbeddings())
+
+    timings = {}
+    results = Reranker("mmr", fetch_k=5, lambda_mult=0.3).search(vectorstore, "q", k=3, timings=timings)
+    assert [document.page_content for document in results] == ["recipe 0", "recipe 4", "recipe 2"]
+    assert "rerank_ms" in timings
+    plain = Reranker("none").search(vectorstore, "q", k=3)
+    assert [document.page_content for document in plain] == ["recipe 0", "recipe 1", "recipe 2"]
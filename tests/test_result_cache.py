@@ -0,0 +1,63 @@
+import time
+
+from recipe_search.result_cache import ResultCache, normalize_query
+
+
+def test_normalized_queries_share_an_entry():
+    cache = ResultCache()
+    cache.put("Lunch, with  POTATO!", "cached")
+    assert normalize_query("Lunch, with  POTATO!") == "lunch with potato"
+    assert cache.get_exact("lunch with potato") == "cached"
+
+
+def test_entries_expire(monkeypatch):
+    cache = ResultCache(ttl=10)
+    cache.put("lunch", "cached", vector=[1, 0])
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 11)
+    assert cache.get_exact("lunch") is None
+    assert cache.get_similar([1, 0]) is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResultCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get_exact("a")
+    cache.put("c", 3)
+    assert [cache.get_exact(text) for text in "abc"] == [1, None, 3]
+
+
+def test_similar_queries_hit_within_their_namespace():
+    cache = ResultCache(threshold=0.95)
+    cache.put("lunch with potato", "st", vector=[1, 0.1], namespace="RecipeST")
+    assert cache.get_similar([1, 0.12], namespace="RecipeST") == "st"
+    assert cache.get_similar([1, 0.12], namespace="RecipeHFE") is None
+    assert cache.get_similar([0.1, 1], namespace="RecipeST") is None
+
+
+def test_vectors_of_another_dimension_are_ignored(tmp_path):
+    path = str(tmp_path / "answers.json")
+    cache = ResultCache(path=path)
+    cache.put("lunch", "two dimensions", vector=[1, 0], namespace="rag")
+    cache.save()
+
+    # The embedding model changed between runs
+    reloaded = ResultCache(path=path)
+    assert reloaded.get_similar([1, 0, 0], namespace="rag") is None
+    reloaded.put("dinner", "three dimensions", vector=[0, 1, 0], namespace="rag")
+    assert reloaded.get_similar([0, 1, 0], namespace="rag") == "three dimensions"
+    assert reloaded.get_similar([1, 0], namespace="rag") == "two dimensions"
+
+
+def test_get_or_compute_reuses_the_embedding():
+    cache = ResultCache()
+    calls = []
+
+    def compute(text, vector):
+        calls.append(vector)
+        return text.upper()
+
+    assert cache.get_or_compute("lunch", compute, embed=lambda text: [1, 0]) == "LUNCH"
+    assert cache.get_or_compute("Lunch!", compute, embed=lambda text: [1, 0]) == "LUNCH"
+    assert calls == [[1, 0]]
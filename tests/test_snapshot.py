@@ -0,0 +1,29 @@
+import pytest
+
+from recipe_search.local_index import LocalIndexWriter
+from recipe_search.snapshot import SnapshotWriter, export_local_index, read_snapshot
+
+
+def test_local_index_export_keeps_columns_the_first_row_lacks(tmp_path):
+    with LocalIndexWriter(str(tmp_path), build_hnsw=False) as writer:
+        writer.add_object("Recipes", properties={"title": "Toast"}, vector=[1.0, 0.0])
+        writer.add_object("Recipes", properties={"title": "Soup", "calories": 250.0, "servings": 4}, vector=[0.0, 1.0])
+        writer.add_object("Recipes", properties={"title": "Stew", "servings": 2.5}, vector=[1.0, 1.0])
+
+    path = str(tmp_path / "recipes.arrow")
+    assert export_local_index("Recipes", path, directory=str(tmp_path)) == 3
+    snapshot = read_snapshot(path)
+    assert {name: data_type.value for name, data_type in snapshot.schema.items()} == {
+        "title": "text", "calories": "number", "servings": "number",
+    }
+    _, properties, vectors = next(snapshot.batches())
+    assert properties == [{"title": "Toast"}, {"title": "Soup", "calories": 250.0, "servings": 4.0}, {"title": "Stew", "servings": 2.5}]
+    assert vectors.shape == (3, 2)
+
+
+def test_empty_snapshot_is_refused(tmp_path):
+    path = tmp_path / "recipes.parquet"
+    with pytest.raises(ValueError, match="No recipes"):
+        with SnapshotWriter(str(path)):
+            pass
+    assert not path.exists()
@@ -0,0 +1,61 @@
+import json
+from types import SimpleNamespace
+
+from recipe_search.sync import RecipeSync, recipe_uuid
+
+SOUP = {"url": "https://example.com/soup", "title": "Potato soup", "calories": 250}
+CAKE = {"url": "https://example.com/cake", "title": "Chocolate cake", "calories": 700}
+
+
+class FakeCollection:
+    def __init__(self):
+        self.deleted = []
+        self.data = SimpleNamespace(delete_many=self.delete_many)
+
+    def delete_many(self, where):
+        self.deleted += where.value
+
+
+def failed_upload(recipe):
+    return SimpleNamespace(object_=SimpleNamespace(uuid=recipe_uuid(recipe)))
+
+
+def test_first_sync_uploads_everything_and_saves_the_manifest(tmp_path):
+    sync = RecipeSync("Recipes", manifest_dir=str(tmp_path))
+    assert list(sync.changed([SOUP, CAKE])) == [SOUP, CAKE]
+    sync.commit(FakeCollection())
+    with open(sync.path) as f:
+        assert set(json.load(f)) == {recipe_uuid(SOUP), recipe_uuid(CAKE)}
+    assert len(RecipeSync("Recipes", manifest_dir=str(tmp_path)).previous) == 2
+
+
+def test_only_changed_recipes_are_uploaded_and_removed_ones_deleted(tmp_path):
+    sync = RecipeSync("Recipes", manifest_dir=str(tmp_path))
+    list(sync.changed([SOUP, CAKE]))
+    sync.commit(FakeCollection())
+
+    sync = RecipeSync("Recipes", manifest_dir=str(tmp_path))
+    lighter_soup = {**SOUP, "calories": 200}
+    assert list(sync.changed([lighter_soup])) == [lighter_soup]
+    assert (sync.inserted, sync.updated) == (0, 1)
+    assert sync.stale() == [recipe_uuid(CAKE)]
+    collection = FakeCollection()
+    sync.commit(collection)
+    assert collection.deleted == [recipe_uuid(CAKE)]
+    assert list(RecipeSync("Recipes", manifest_dir=str(tmp_path)).changed([lighter_soup])) == []
+
+
+def test_failed_uploads_are_retried_by_the_next_sync(tmp_path):
+    sync = RecipeSync("Recipes", manifest_dir=str(tmp_path))
+    list(sync.changed([SOUP]))
+    sync.commit(FakeCollection())
+
+    sync = RecipeSync("Recipes", manifest_dir=str(tmp_path))
+    lighter_soup = {**SOUP, "calories": 200}
+    list(sync.changed([lighter_soup, CAKE]))
+    sync.commit(FakeCollection(), failed=[failed_upload(lighter_soup), failed_upload(CAKE)])
+
+    # The soup keeps its old hash and the cake is unknown, so both are uploaded again
+    sync = RecipeSync("Recipes", manifest_dir=str(tmp_path))
+    assert list(sync.changed([lighter_soup, CAKE])) == [lighter_soup, CAKE]
+    assert (sync.inserted, sync.updated) == (1, 1)
@@ -0,0 +1,56 @@
+import threading
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+from recipe_search.upload import AdaptiveUploader
+
+
+class FakeBatch:
+    """Stands in for ``client.batch``; throttles every object whose uuid is in ``throttled``."""
+
+    def __init__(self, throttled=()):
+        self.throttled = set(throttled)
+        self.failed_objects = []
+        self.received = []
+        self.threads = set()
+
+    @contextmanager
+    def fixed_size(self, batch_size, concurrent_requests):
+        self.threads.add(threading.current_thread().name)
+        objects = []
+        yield SimpleNamespace(add_object=lambda **obj: objects.append(obj))
+        self.failed_objects = [
+            SimpleNamespace(message="429 Too Many Requests", object_=SimpleNamespace(**obj))
+            for obj in objects
+            if obj["uuid"] in self.throttled
+        ]
+        self.received += [obj["uuid"] for obj in objects if obj["uuid"] not in self.throttled]
+
+
+def uploader(batch, **kwargs):
+    return AdaptiveUploader(SimpleNamespace(batch=batch), concurrency=2, max_concurrency=4, base_delay=0, **kwargs)
+
+
+def test_windows_are_sent_in_the_background():
+    batch = FakeBatch()
+    with uploader(batch, window=3) as open_batch:
+        for i in range(10):
+            open_batch.add_object("Recipes", properties={}, uuid=i)
+
+    assert batch.received == list(range(10))
+    assert threading.current_thread().name not in batch.threads
+    assert open_batch.sent == 10
+    assert open_batch.concurrency == 4
+
+
+def test_objects_throttled_after_the_last_retry_fail_without_speeding_up():
+    batch = FakeBatch(throttled={1})
+    with uploader(batch, max_retries=2) as open_batch:
+        for i in range(3):
+            open_batch.add_object("Recipes", properties={}, uuid=i)
+
+    assert batch.received == [0, 2]
+    assert len(open_batch.failed) == 1
+    assert open_batch.retried == 2
+    # Halved on each of the two throttled attempts and not raised after giving up
+    assert open_batch.concurrency == 1